@@ -2,6 +2,7 @@
 import logging
 from typing import Dict, Any, Optional, List
 from api.delta_client import DeltaExchangeClient
+from config.settings import settings
 
 logger = logging.getLogger(__name__)
 
@@ -21,7 +22,7 @@ async def get_wallet_balances(client: DeltaExchangeClient) -> Optional[List[Dict
         
         if response and response.get("success"):
             balances = response.get("result", [])
-            logger.info(f"✅ Retrieved {len(balances)} wallet balances")
+            logger.debug("✅ Retrieved %d wallet balances", len(balances))
             return balances
         
         logger.error(f"❌ Failed to get wallet balances: {response}")
@@ -65,16 +66,17 @@ async def get_account_summary(client: DeltaExchangeClient) -> Optional[Dict[str,
                 locked_margin = balance_value - available
                 break
         
+        usd_to_inr = settings.usd_to_inr_rate
         summary = {
             "total_balance": round(total_balance, 2),
             "available_balance": round(available_balance, 2),
             "locked_margin": round(locked_margin, 2),
-            "total_balance_inr": round(total_balance * 85, 2),
-            "available_balance_inr": round(available_balance * 85, 2),
-            "locked_margin_inr": round(locked_margin * 85, 2)
+            "total_balance_inr": round(total_balance * usd_to_inr, 2),
+            "available_balance_inr": round(available_balance * usd_to_inr, 2),
+            "locked_margin_inr": round(locked_margin * usd_to_inr, 2)
         }
         
-        logger.info(f"✅ Account summary: Total=${total_balance}, Available=${available_balance}")
+        logger.debug("✅ Account summary: Total=$%s, Available=$%s", total_balance, available_balance)
         return summary
         
     except Exception as e:
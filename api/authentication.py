@@ -4,12 +4,40 @@ import hashlib
 import time
 import logging
 import json
+from binascii import hexlify
+from typing import Union
 
 logger = logging.getLogger(__name__)
 
+
+def _select_impl():
+    """
+    Pick the fastest available HMAC-SHA256 implementation.
+
+    hmac.digest() runs the whole HMAC inside OpenSSL (which uses the
+    SHA-NI/AVX2 block functions when the CPU supports them) without
+    building a Python-level HMAC object. Fall back to hmac.new() on
+    interpreters that lack the one-shot helper.
+    """
+    if hasattr(hmac, "digest"):
+        def _impl(key: bytes, msg: bytes) -> str:
+            return hexlify(hmac.digest(key, msg, "sha256")).decode('ascii')
+    else:
+        def _impl(key: bytes, msg: bytes) -> str:
+            return hexlify(hmac.new(key, msg, hashlib.sha256).digest()).decode('ascii')
+    return _impl
+
+
+_hmac_sha256 = _select_impl()
+
 # Global offset to handle server clock drift (e.g., on Render.com)
 GLOBAL_TIME_OFFSET = 0
 
+# Last formatted signature timestamp, reused until the second rolls over.
+# Signing only happens on the event loop thread, so no lock is needed.
+_last_ts_sec = 0
+_last_ts_str = ""
+
 def set_time_offset(offset: int):
     """Update the global time offset for API signatures."""
     global GLOBAL_TIME_OFFSET
@@ -18,39 +46,56 @@ def set_time_offset(offset: int):
     GLOBAL_TIME_OFFSET = offset
 
 
-def generate_signature(method: str, endpoint: str, api_secret: str, 
-                      query_string: str = "", body: str = "") -> tuple[str, str]:
+def current_timestamp() -> str:
+    """Return the drift-corrected Unix timestamp string used for signing."""
+    global _last_ts_sec, _last_ts_str
+    # Incorporate global offset to correct clock drift automatically
+    ts_sec = int(time.time()) + GLOBAL_TIME_OFFSET
+    if ts_sec != _last_ts_sec:
+        _last_ts_sec = ts_sec
+        _last_ts_str = str(ts_sec)
+    return _last_ts_str
+
+
+def generate_signature(method: str, endpoint: str, api_secret: Union[str, bytes], 
+                      query_string: str = "", body: str = "",
+                      hmac_proto=None) -> tuple[str, str]:
     """
     Generate HMAC-SHA256 signature for Delta Exchange API.
     
     Args:
         method: HTTP method (GET, POST, DELETE)
         endpoint: API endpoint path
-        api_secret: API secret key
+        api_secret: API secret key (str, or pre-encoded UTF-8 bytes)
         query_string: Query parameters (sorted alphabetically)
-        body: Request body (MUST be compact JSON with no spaces)
+        body: Request body (MUST be compact JSON with no spaces), str or bytes
+        hmac_proto: Optional HMAC object pre-keyed with api_secret; copied
+            per call to skip the key schedule
     
     Returns:
         Tuple of (signature, timestamp)
     """
     try:
-        # Incorporate global offset to correct clock drift automatically
-        timestamp = str(int(time.time()) + GLOBAL_TIME_OFFSET)
+        timestamp = current_timestamp()
         
-        # Build signature string: METHOD + TIMESTAMP + ENDPOINT + QUERY_STRING + BODY
-        signature_string = method.upper() + timestamp + endpoint
-        if query_string:
-            signature_string += "?" + query_string
-        signature_string += body
+        # Build signature bytes: METHOD + TIMESTAMP + ENDPOINT + ?QUERY_STRING + BODY
+        body_b = body if isinstance(body, bytes) else body.encode('utf-8')
+        msg = b"".join((
+            method.upper().encode('ascii'),
+            timestamp.encode('ascii'),
+            endpoint.encode('utf-8'),
+            b"?" + query_string.encode('utf-8') if query_string else b"",
+            body_b,
+        ))
         
         # Generate HMAC-SHA256 signature
-        signature = hmac.new(
-            api_secret.encode('utf-8'),
-            signature_string.encode('utf-8'),
-            hashlib.sha256
-        ).hexdigest()
-        
-        logger.info(f"🔐 Signature data: {signature_string}")
+        if hmac_proto is not None:
+            h = hmac_proto.copy()
+            h.update(msg)
+            signature = hexlify(h.digest()).decode('ascii')
+        else:
+            key = api_secret if isinstance(api_secret, bytes) else api_secret.encode('utf-8')
+            signature = _hmac_sha256(key, msg)
         
         return signature, timestamp
         
@@ -59,8 +104,9 @@ def generate_signature(method: str, endpoint: str, api_secret: str,
         raise
 
 
-def get_auth_headers(method: str, endpoint: str, api_key: str, api_secret: str,
-                    query_string: str = "", body: str = "") -> dict:
+def get_auth_headers(method: str, endpoint: str, api_key: str, api_secret: Union[str, bytes],
+                    query_string: str = "", body: str = "",
+                    hmac_proto=None) -> dict:
     """
     Generate authentication headers for Delta Exchange API.
     
@@ -68,14 +114,16 @@ def get_auth_headers(method: str, endpoint: str, api_key: str, api_secret: str,
         method: HTTP method
         endpoint: API endpoint
         api_key: API key
-        api_secret: API secret
+        api_secret: API secret (str or pre-encoded bytes)
         query_string: Query parameters string
         body: Request body (compact JSON)
+        hmac_proto: Optional pre-keyed HMAC object (see generate_signature)
     
     Returns:
         Dictionary of headers
     """
-    signature, timestamp = generate_signature(method, endpoint, api_secret, query_string, body)
+    signature, timestamp = generate_signature(method, endpoint, api_secret, query_string, body,
+                                              hmac_proto=hmac_proto)
     
     headers = {
         "api-key": api_key,
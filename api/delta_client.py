@@ -1,16 +1,60 @@
 """Delta Exchange API client with rate limiting and retry logic."""
 import asyncio
+import copy
+import hashlib
+import hmac
 import logging
-import json  # ← MISSING IMPORT!
-from typing import Dict, Any, Optional
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Tuple
 import httpx
+import orjson
 import time
+from urllib.parse import urlencode
 from config.settings import settings
-from config.constants import REQUEST_RETRY_ATTEMPTS, REQUEST_RETRY_DELAY
-from api.authentication import get_auth_headers, set_time_offset
+from config.constants import REQUEST_RETRY_ATTEMPTS, REQUEST_RETRY_DELAY, MAX_REQUESTS_PER_SECOND
+from api.authentication import get_auth_headers, set_time_offset, current_timestamp
 
 logger = logging.getLogger(__name__)
 
+# Max GET signatures remembered per client (LRU)
+_SIG_CACHE_SIZE = 128
+
+# Set on a coalesced GET's future when its leading caller was cancelled
+_LEADER_CANCELLED = object()
+
+# base_url -> pooled HTTP client shared by every DeltaExchangeClient
+_shared_http: Dict[str, httpx.AsyncClient] = {}
+
+
+def _get_shared_http(base_url: str) -> httpx.AsyncClient:
+    """
+    Pooled HTTP client for base_url, created lazily and shared across accounts.
+    
+    Authentication is per request (signed headers), so every
+    DeltaExchangeClient can reuse the same TLS connections. A new pool is
+    opened if the previous one was closed.
+    """
+    http = _shared_http.get(base_url)
+    if http is not None and not http.is_closed:
+        return http
+    
+    # HTTP/2 lets concurrent calls share one TLS session; keep-alive avoids re-handshakes
+    http = _shared_http[base_url] = httpx.AsyncClient(
+        base_url=base_url,
+        http2=True,
+        limits=httpx.Limits(max_keepalive_connections=20, max_connections=100, keepalive_expiry=60),
+        timeout=httpx.Timeout(30.0, connect=3.0)
+    )
+    return http
+
+
+async def close_shared_http() -> None:
+    """Close the shared HTTP pools on the running loop (call once on application shutdown)."""
+    pools = list(_shared_http.values())
+    _shared_http.clear()
+    for http in pools:
+        await http.aclose()
+
 
 class DeltaExchangeClient:
     """Async client for Delta Exchange India API."""
@@ -25,29 +69,149 @@ class DeltaExchangeClient:
         """
         self.api_key = api_key
         self.api_secret = api_secret
+        # Secret is fixed per client: key the HMAC once and copy() it per request
+        self._api_secret_bytes = api_secret.encode('utf-8')
+        self._hmac_proto = hmac.new(self._api_secret_bytes, digestmod=hashlib.sha256)
         self.base_url = settings.delta_api_base_url
-        self.client = httpx.AsyncClient(timeout=30.0)
-        self._rate_limit_lock = asyncio.Lock()
-        self._last_request_time = 0
-        self._min_request_interval = 0.1  # 10 requests per second max
+        # Token bucket tracked as a single deadline (GCRA): capacity-sized bursts,
+        # refilled at MAX_REQUESTS_PER_SECOND
+        self._next_send = 0.0
+        self._min_request_interval = 1.0 / MAX_REQUESTS_PER_SECOND
+        self._burst_allowance = (MAX_REQUESTS_PER_SECOND - 1) * self._min_request_interval
+        # (endpoint, query_string) -> signed GET headers, valid for their timestamp second
+        self._sig_cache: "OrderedDict[Tuple[str, str], Dict[str, str]]" = OrderedDict()
+        # (endpoint, query_string) -> Future of an in-flight GET, shared by identical callers
+        self._inflight: Dict[Tuple[str, str], asyncio.Future] = {}
+    
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """
+        HTTP client shared by all DeltaExchangeClient instances.
+        
+        Clients that are constructed but never used (e.g. a credential check
+        that bails early) never open a connection pool.
+        """
+        return _get_shared_http(self.base_url)
     
     async def close(self):
-        """Close HTTP client."""
-        await self.client.aclose()
+        """
+        Release this client. Intentionally a no-op.
+        
+        The connection pool is shared with every other account and must stay
+        open for them; close_shared_http() closes it on application shutdown.
+        """
+    
+    async def aclose(self):
+        """Release this client (alias of close, matching httpx/asyncio naming)."""
+        await self.close()
+    
+    async def __aenter__(self) -> "DeltaExchangeClient":
+        return self
+    
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        await self.close()
     
     async def _rate_limit(self):
-        """Implement rate limiting."""
-        async with self._rate_limit_lock:
-            current_time = asyncio.get_event_loop().time()
-            time_since_last = current_time - self._last_request_time
-            
-            if time_since_last < self._min_request_interval:
-                await asyncio.sleep(self._min_request_interval - time_since_last)
-            
-            self._last_request_time = asyncio.get_event_loop().time()
+        """
+        Implement rate limiting without a lock.
+        
+        Each caller reserves its send slot before awaiting, which is safe on
+        the single-threaded event loop, so concurrent requests only wait when
+        the bucket is actually empty.
+        """
+        now = time.monotonic()
+        slot = max(self._next_send, now)
+        self._next_send = slot + self._min_request_interval
+        wait = slot - now - self._burst_allowance
+        if wait > 0:
+            await asyncio.sleep(wait)
+    
+    def _get_headers(self, method: str, endpoint: str, query_string: str, body: bytes) -> Dict[str, str]:
+        """
+        Build signed headers, reusing a GET signature made in the same second.
+        
+        The signature only depends on method/timestamp/endpoint/query/body, so
+        poll loops hitting the same bodiless GET within one second share it.
+        """
+        if method != "GET" or body:
+            return get_auth_headers(
+                method=method,
+                endpoint=endpoint,
+                api_key=self.api_key,
+                api_secret=self._api_secret_bytes,
+                query_string=query_string,
+                body=body,
+                hmac_proto=self._hmac_proto
+            )
+        
+        key = (endpoint, query_string)
+        cached = self._sig_cache.get(key)
+        if cached is not None and cached["timestamp"] == current_timestamp():
+            self._sig_cache.move_to_end(key)
+            return dict(cached)
+        
+        headers = get_auth_headers(
+            method=method,
+            endpoint=endpoint,
+            api_key=self.api_key,
+            api_secret=self._api_secret_bytes,
+            query_string=query_string,
+            hmac_proto=self._hmac_proto
+        )
+        self._sig_cache[key] = headers
+        self._sig_cache.move_to_end(key)
+        if len(self._sig_cache) > _SIG_CACHE_SIZE:
+            self._sig_cache.popitem(last=False)
+        return dict(headers)
     
     async def _request(self, method: str, endpoint: str, params: Optional[Dict] = None,
-                      json_data: Optional[Dict] = None, retry: int = 0) -> Optional[Dict[str, Any]]:
+                      json_data: Optional[Dict] = None, retry: int = 0,
+                      etag: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """
+        Make authenticated request, coalescing identical concurrent GETs.
+        
+        A GET that matches one already in flight awaits that request's result
+        instead of issuing its own, and gets its own copy of the response.
+        If the caller that sent the request is cancelled, the waiting callers
+        send it again. Retries, conditional GETs and non-GET methods are never
+        coalesced.
+        """
+        if method.upper() != "GET" or retry or etag is not None:
+            return await self._send_request(method, endpoint, params, json_data, retry, etag=etag)
+        
+        key = (endpoint, urlencode(sorted(params.items()), doseq=True) if params else "")
+        pending = self._inflight.get(key)
+        if pending is not None:
+            # shield: a cancelled waiter must not cancel the shared request
+            result = await asyncio.shield(pending)
+            if result is _LEADER_CANCELLED:
+                # Not our cancellation: send the request again (or join whoever did)
+                return await self._request(method, endpoint, params, json_data, retry)
+            # Callers may edit their result, so waiters never share the leader's dict
+            return copy.deepcopy(result)
+        
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            result = await self._send_request(method, endpoint, params, json_data, retry)
+        except asyncio.CancelledError:
+            future.set_result(_LEADER_CANCELLED)
+            raise
+        except BaseException as e:
+            # Waiters re-raise the same error instead of hanging on the future
+            future.set_exception(e)
+            # Mark it retrieved so a GET with no waiters does not log "never retrieved"
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            self._inflight.pop(key, None)
+    
+    async def _send_request(self, method: str, endpoint: str, params: Optional[Dict] = None,
+                            json_data: Optional[Dict] = None, retry: int = 0,
+                            etag: Optional[str] = None) -> Optional[Dict[str, Any]]:
         """
         Make authenticated request to Delta Exchange API.
     
@@ -57,39 +221,31 @@ class DeltaExchangeClient:
             params: Query parameters
             json_data: JSON body data
             retry: Current retry attempt
+            etag: Conditional GET. A non-empty value is sent as If-None-Match;
+                any non-None value adds the response "etag" to the result
         
         Returns:
-            Response JSON or None on failure
+            Response JSON (with "not_modified": True on 304) or None on failure
         """
         await self._rate_limit()
     
         try:
-            # Prepare query string (sorted alphabetically)
-            query_string = ""
-            if params:
-                sorted_params = sorted(params.items())
-                query_string = "&".join([f"{k}={v}" for k, v in sorted_params])
+            # Prepare query string (sorted alphabetically; urlencode keeps the given order)
+            query_string = urlencode(sorted(params.items()), doseq=True) if params else ""
             
             # Prepare body (compact JSON with NO SPACES)
-            body = ""
+            body = b""
             if json_data:
-                # CRITICAL: Use separators with NO SPACES
-                body = json.dumps(json_data, separators=(',', ':'))
+                # CRITICAL: orjson emits compact bytes (no spaces), signed and sent as-is
+                body = orjson.dumps(json_data)
         
             # Generate authentication headers
-            headers = get_auth_headers(
-                method=method.upper(),
-                endpoint=endpoint,
-                api_key=self.api_key,
-                api_secret=self.api_secret,
-                query_string=query_string,
-                body=body
-            )
+            headers = self._get_headers(method.upper(), endpoint, query_string, body)
+            if etag:
+                headers["If-None-Match"] = etag
         
-            # Build full URL
-            url = f"{self.base_url}{endpoint}"
-            if query_string:
-                url = f"{url}?{query_string}"
+            # Build URL relative to the client's base_url
+            url = f"{endpoint}?{query_string}" if query_string else endpoint
         
             # Make request
             if method.upper() == "GET":
@@ -108,18 +264,24 @@ class DeltaExchangeClient:
         
             # Check response
             if response.status_code == 200:
-                return response.json()
+                data = orjson.loads(response.content)
+                if etag is not None and isinstance(data, dict):
+                    data["etag"] = response.headers.get("etag")
+                return data
+            
+            elif response.status_code == 304 and etag:
+                return {"success": True, "not_modified": True, "etag": etag}
         
             elif response.status_code == 429:  # Rate limit
                 logger.warning(f"⚠️ Rate limit hit, retrying after delay...")
                 await asyncio.sleep(2)
                 if retry < REQUEST_RETRY_ATTEMPTS:
-                    return await self._request(method, endpoint, params, json_data, retry + 1)
+                    return await self._request(method, endpoint, params, json_data, retry + 1, etag=etag)
         
             elif response.status_code == 401:
                 # Handle expired signature automatically for clock drift
                 try:
-                    resp_json = response.json()
+                    resp_json = orjson.loads(response.content)
                     err = resp_json.get("error", {})
                     if err.get("code") == "expired_signature":
                         context = err.get("context", {})
@@ -129,7 +291,7 @@ class DeltaExchangeClient:
                             set_time_offset(new_offset)
                             if retry < REQUEST_RETRY_ATTEMPTS:
                                 logger.info("🔄 Retrying request after time drift correction...")
-                                return await self._request(method, endpoint, params, json_data, retry + 1)
+                                return await self._request(method, endpoint, params, json_data, retry + 1, etag=etag)
                 except Exception:
                     pass
                     
@@ -144,19 +306,20 @@ class DeltaExchangeClient:
             logger.error(f"❌ Request timeout for {endpoint}")
             if retry < REQUEST_RETRY_ATTEMPTS:
                 await asyncio.sleep(REQUEST_RETRY_DELAY * (retry + 1))
-                return await self._request(method, endpoint, params, json_data, retry + 1)
+                return await self._request(method, endpoint, params, json_data, retry + 1, etag=etag)
             return None
     
         except Exception as e:
             logger.error(f"❌ Request failed: {e}")
             if retry < REQUEST_RETRY_ATTEMPTS:
                 await asyncio.sleep(REQUEST_RETRY_DELAY * (retry + 1))
-                return await self._request(method, endpoint, params, json_data, retry + 1)
+                return await self._request(method, endpoint, params, json_data, retry + 1, etag=etag)
             return None
     
-    async def get(self, endpoint: str, params: Optional[Dict] = None) -> Optional[Dict[str, Any]]:
-        """Make GET request."""
-        return await self._request("GET", endpoint, params=params)
+    async def get(self, endpoint: str, params: Optional[Dict] = None,
+                  etag: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """Make GET request (conditional on etag if one is given)."""
+        return await self._request("GET", endpoint, params=params, etag=etag)
     
     async def post(self, endpoint: str, json_data: Dict) -> Optional[Dict[str, Any]]:
         """Make POST request."""
@@ -1,44 +1,147 @@
 """Market data operations - products, tickers, candles."""
+import asyncio
 import logging
-from typing import Dict, Any, Optional, List
-from datetime import datetime, timedelta
+import operator
+import time
+from typing import Dict, Any, Optional, List, Tuple
 from api.delta_client import DeltaExchangeClient
-from config.constants import TIMEFRAME_MAPPING
+from config.constants import TIMEFRAME_MAPPING, TIMEFRAME_SECONDS
+from utils import product_cache
 
 logger = logging.getLogger(__name__)
 
-# Cache for products
-_products_cache: Optional[List[Dict[str, Any]]] = None
-_products_cache_time: Optional[datetime] = None
+# Cache for products, per API base URL (products are public, so every
+# account client on the same exchange shares one entry):
+# base_url -> (products, products by symbol, time.monotonic() deadline)
+_products_cache: Dict[str, Tuple[List[Dict[str, Any]], Dict[str, Dict[str, Any]], float]] = {}
 _cache_expiry_seconds = 86400  # 24 hours
+_products_disk_lock = asyncio.Lock()
+# base_url -> Future of the refresh in flight for it
+_products_inflight: Dict[str, asyncio.Future] = {}
+
+# Default candle count per timeframe when get_candles is called without a limit
+_TIMEFRAME_CANDLE_COUNT = {
+    # ===== MINUTES =====
+    "1m": 450,
+    "2m": 300,
+    "3m": 200,      # ← FIXED: Reduced from 450
+    "4m": 225,
+    "5m": 200,      # ← REDUCED
+    "10m": 150,
+    "15m": 150,     # ← REDUCED from 450
+    "20m": 135,
+    "30m": 120,     # ← REDUCED from 450
+    "45m": 100,
+    
+    # ===== HOURS =====
+    "1h": 100,
+    "2h": 75,
+    "3h": 60,
+    "4h": 60,       # ← REDUCED from 800
+    "6h": 50,
+    "8h": 40,
+    "12h": 30,
+    
+    # ===== DAYS =====
+    "1d": 50,       # ← REDUCED from 1000
+    "2d": 40,
+    "3d": 30,
+    "7d": 25,
+    "1w": 25,
+}
+
+# Snapshot of all tickers from the last /v2/tickers call, per API base URL:
+# base_url -> (time.monotonic() fetched, symbol -> ticker)
+_tickers_snapshots: Dict[str, Tuple[float, Dict[str, Dict[str, Any]]]] = {}
+_tickers_ttl_seconds = 2.0
+# base_url -> lock held while that snapshot is refreshed
+_tickers_locks: Dict[str, asyncio.Lock] = {}
+
+# Live candle fetches (no explicit start/end), keyed by request shape and
+# stored with the end-time bucket they were fetched in
+_candles_cache: Dict[tuple, tuple] = {}
+_candles_cache_max_seconds = 5  # the forming candle's OHLC must stay fresh
+
+
+def _store_products(base_url: str, products: List[Dict[str, Any]],
+                    ttl: float = _cache_expiry_seconds) -> None:
+    """Install a product list as the in-process cache for base_url."""
+    by_symbol = {p["symbol"]: p for p in products if "symbol" in p}
+    _products_cache[base_url] = (products, by_symbol, time.monotonic() + ttl)
+
+
+async def _save_products(base_url: str, products: List[Dict[str, Any]], etag: Optional[str]) -> None:
+    """Persist the product list to disk, one writer at a time."""
+    async with _products_disk_lock:
+        await asyncio.to_thread(product_cache.save, products, etag, base_url)
 
 
 async def get_products(client: DeltaExchangeClient, force_refresh: bool = False) -> Optional[List[Dict[str, Any]]]:
     """
     Get all available products (with caching).
     
+    Checks the in-process cache, then the on-disk cache, then revalidates
+    with Delta using the stored ETag (a 304 reuses the disk copy).
+    
     Args:
         client: Delta Exchange client instance
-        force_refresh: Force refresh cache
+        force_refresh: Skip the TTL checks and revalidate with the API
     
     Returns:
         List of products or None
     """
-    global _products_cache, _products_cache_time
+    base_url = client.base_url
+    
+    # Check cache
+    entry = _products_cache.get(base_url)
+    if not force_refresh and entry and entry[0] and time.monotonic() < entry[2]:
+        return entry[0]
+    
+    # Single-flight: concurrent misses for the same exchange share one refresh
+    pending = _products_inflight.get(base_url)
+    if pending is not None:
+        return await asyncio.shield(pending)
     
+    future = asyncio.get_running_loop().create_future()
+    _products_inflight[base_url] = future
     try:
-        # Check cache
-        if not force_refresh and _products_cache and _products_cache_time:
-            if (datetime.utcnow() - _products_cache_time).seconds < _cache_expiry_seconds:
-                return _products_cache
+        products = await _refresh_products(client, force_refresh)
+    except asyncio.CancelledError:
+        future.cancel()
+        raise
+    else:
+        future.set_result(products)
+        return products
+    finally:
+        _products_inflight.pop(base_url, None)
+
+
+async def _refresh_products(client: DeltaExchangeClient, force_refresh: bool) -> Optional[List[Dict[str, Any]]]:
+    """Reload products from the disk cache or the API (see get_products)."""
+    base_url = client.base_url
+    try:
+        # Survive restarts: a fresh on-disk copy avoids the network entirely
+        cached = await asyncio.to_thread(product_cache.load, base_url)
+        if cached and not force_refresh:
+            age = time.time() - cached.get("saved_at", 0)
+            if 0 <= age < _cache_expiry_seconds:
+                products = cached["products"]
+                _store_products(base_url, products, _cache_expiry_seconds - age)
+                return products
         
-        # Fetch fresh data
-        response = await client.get("/v2/products")
+        # Fetch fresh data (conditional on the cached ETag, if any)
+        response = await client.get("/v2/products", etag=(cached or {}).get("etag") or "")
+        
+        if response and response.get("not_modified") and cached:
+            products = cached["products"]
+            _store_products(base_url, products)
+            await _save_products(base_url, products, cached.get("etag"))
+            return products
         
         if response and response.get("success"):
             products = response.get("result", [])
-            _products_cache = products
-            _products_cache_time = datetime.utcnow()
+            _store_products(base_url, products)
+            await _save_products(base_url, products, response.get("etag"))
             return products
         
         logger.error(f"❌ Failed to get products: {response}")
@@ -66,11 +169,12 @@ async def get_product_by_symbol(client: DeltaExchangeClient, symbol: str) -> Opt
         if not products:
             return None
         
-        for product in products:
-            if product.get("symbol") == symbol:
-                return product
+        entry = _products_cache.get(client.base_url)
+        product = entry[1].get(symbol) if entry else None
+        if product:
+            return product
         
-        logger.warning(f"⚠️ Product not found: {symbol}")
+        logger.warning("⚠️ Product not found: %s", symbol)
         return None
         
     except Exception as e:
@@ -78,25 +182,89 @@ async def get_product_by_symbol(client: DeltaExchangeClient, symbol: str) -> Opt
         return None
 
 
-async def get_ticker(client: DeltaExchangeClient, symbol: str) -> Optional[Dict[str, Any]]:
+async def get_tickers_snapshot(client: DeltaExchangeClient,
+                               ttl: float = _tickers_ttl_seconds) -> Dict[str, Dict[str, Any]]:
+    """
+    Get a symbol -> ticker map of every instrument, shared across callers.
+    
+    Delta ignores the symbol filter on /v2/tickers and always returns every
+    instrument, so one call is reused by all callers for ``ttl`` seconds.
+    Concurrent callers on a stale snapshot wait for a single refresh.
+    
+    Args:
+        client: Delta Exchange client instance
+        ttl: Maximum snapshot age in seconds
+    
+    Returns:
+        Dict of symbol -> ticker (empty on failure)
+    """
+    base_url = client.base_url
+    entry = _tickers_snapshots.get(base_url)
+    if entry is not None and time.monotonic() - entry[0] < ttl:
+        return entry[1]
+    
+    lock = _tickers_locks.get(base_url)
+    if lock is None:
+        lock = _tickers_locks[base_url] = asyncio.Lock()
+    async with lock:
+        # Another caller may have refreshed it while we waited
+        entry = _tickers_snapshots.get(base_url)
+        if entry is not None and time.monotonic() - entry[0] < ttl:
+            return entry[1]
+        
+        try:
+            response = await client.get("/v2/tickers")
+            
+            if response and response.get("success"):
+                snapshot = {t["symbol"]: t for t in response.get("result", []) if t.get("symbol")}
+                _tickers_snapshots[base_url] = (time.monotonic(), snapshot)
+                return snapshot
+            
+            logger.error(f"❌ Failed to get tickers: {response}")
+            return {}
+            
+        except Exception as e:
+            logger.error(f"❌ Exception getting tickers: {e}")
+            return {}
+
+
+async def get_tickers_bulk(client: DeltaExchangeClient, symbols: List[str]) -> Dict[str, Dict[str, Any]]:
+    """
+    Get ticker data for many symbols from one tickers snapshot.
+    
+    Args:
+        client: Delta Exchange client instance
+        symbols: Trading symbols to return
+    
+    Returns:
+        Dict of symbol -> ticker for the symbols that were found
+    """
+    snapshot = await get_tickers_snapshot(client)
+    return {s: snapshot[s] for s in symbols if s in snapshot}
+
+
+async def get_ticker(client: DeltaExchangeClient, symbol: str,
+                     use_cache: bool = True) -> Optional[Dict[str, Any]]:
     """
     Get current ticker data for a symbol.
     
     Args:
         client: Delta Exchange client instance
         symbol: Trading symbol
+        use_cache: Serve from the shared tickers snapshot (up to its TTL old);
+            False fetches this symbol's ticker from the API now
     
     Returns:
         Ticker data or None
     """
     try:
-        response = await client.get("/v2/tickers", params={"symbol": symbol})
-        
-        if response and response.get("success"):
-            tickers = response.get("result", [])
-            for t in tickers:
-                if t.get("symbol") == symbol:
-                    return t
+        if use_cache:
+            ticker = (await get_tickers_snapshot(client)).get(symbol)
+        else:
+            response = await client.get(f"/v2/tickers/{symbol}")
+            ticker = response.get("result") if response and response.get("success") else None
+        if ticker:
+            return ticker
         
         logger.error(f"❌ Failed to get ticker for {symbol}")
         return None
@@ -123,82 +291,34 @@ async def get_candles(client: DeltaExchangeClient, symbol: str, timeframe: str,
         limit: Number of candles (auto-scaled if None)
     
     Returns:
-        List of candle data or None
+        List of candle data or None. Treat candles as read-only data: live
+        fetches (no start/end) may be answered from a short-lived cache, and
+        every call gets its own copy of the rows.
     """
     try:
+        # Short-lived cache for live fetches. Buckets are at most a quarter candle
+        # (capped at a few seconds) and epoch-aligned, so one never spans a candle close.
+        cache_key = None
+        if start_time is None and end_time is None and timeframe in TIMEFRAME_SECONDS:
+            bucket_seconds = min(TIMEFRAME_SECONDS[timeframe] // 4, _candles_cache_max_seconds)
+            bucket = int(time.time()) // max(bucket_seconds, 1)
+            cache_key = (symbol, timeframe, limit)
+            cached = _candles_cache.get(cache_key)
+            if cached is not None and cached[0] == bucket:
+                return [dict(c) for c in cached[1]]
+        
         resolution = TIMEFRAME_MAPPING.get(timeframe, "15m")
         
         # Auto-scale candles based on timeframe if not specified
         if limit is None:
-            # ✅ COMPLETE: ALL timeframes with optimized candle counts
-            timeframe_candle_count = {
-                # ===== MINUTES =====
-                "1m": 450,
-                "2m": 300,
-                "3m": 200,      # ← FIXED: Reduced from 450
-                "4m": 225,
-                "5m": 200,      # ← REDUCED
-                "10m": 150,
-                "15m": 150,     # ← REDUCED from 450
-                "20m": 135,
-                "30m": 120,     # ← REDUCED from 450
-                "45m": 100,
-                
-                # ===== HOURS =====
-                "1h": 100,
-                "2h": 75,
-                "3h": 60,
-                "4h": 60,       # ← REDUCED from 800
-                "6h": 50,
-                "8h": 40,
-                "12h": 30,
-                
-                # ===== DAYS =====
-                "1d": 50,       # ← REDUCED from 1000
-                "2d": 40,
-                "3d": 30,
-                "7d": 25,
-                "1w": 25,
-            }
-            limit = timeframe_candle_count.get(timeframe, 150)
+            limit = _TIMEFRAME_CANDLE_COUNT.get(timeframe, 150)
         
         # Calculate start and end times if not provided
         if not end_time:
-            end_time = int(datetime.utcnow().timestamp())
+            end_time = int(time.time())
         
         if not start_time:
-            # ✅ COMPLETE: ALL timeframes with correct second calculations
-            timeframe_seconds = {
-                # ===== MINUTES =====
-                "1m": 60,
-                "2m": 120,
-                "3m": 180,      # ← CRITICAL: NOW INCLUDED!
-                "4m": 240,
-                "5m": 300,
-                "10m": 600,
-                "15m": 900,
-                "20m": 1200,
-                "30m": 1800,
-                "45m": 2700,
-                
-                # ===== HOURS =====
-                "1h": 3600,
-                "2h": 7200,
-                "3h": 10800,
-                "4h": 14400,
-                "6h": 21600,
-                "8h": 28800,
-                "12h": 43200,
-                
-                # ===== DAYS =====
-                "1d": 86400,
-                "2d": 172800,
-                "3d": 259200,
-                "7d": 604800,
-                "1w": 604800,
-            }
-            
-            seconds_per_candle = timeframe_seconds.get(timeframe)
+            seconds_per_candle = TIMEFRAME_SECONDS.get(timeframe)
             
             # ✅ SAFETY CHECK: Ensure timeframe exists
             if seconds_per_candle is None:
@@ -223,36 +343,45 @@ async def get_candles(client: DeltaExchangeClient, symbol: str, timeframe: str,
             candles = response.get("result", [])
             
             if not candles:
-                logger.info(f"⏸️ Zero volume period: No candles returned for {symbol} {timeframe}")
+                logger.debug("⏸️ Zero volume period: No candles returned for %s %s", symbol, timeframe)
                 return None
         
-            # Convert to more usable format
-            formatted_candles = []
-            for candle in candles:
-                formatted_candles.append({
-                    "time": candle.get("time"),
-                    "open": float(candle.get("open", 0)),
-                    "high": float(candle.get("high", 0)),
-                    "low": float(candle.get("low", 0)),
-                    "close": float(candle.get("close", 0)),
-                    "volume": float(candle.get("volume", 0))
-                })
+            # Convert to more usable format. Delta always sends time/OHLC on each
+            # candle, so index them directly; volume can be null on quiet bars.
+            _f = float
+            formatted_candles = [
+                {
+                    "time": candle["time"],
+                    "open": _f(candle["open"]),
+                    "high": _f(candle["high"]),
+                    "low": _f(candle["low"]),
+                    "close": _f(candle["close"]),
+                    "volume": _f(candle.get("volume") or 0)
+                }
+                for candle in candles
+            ]
             
-            # Sort by time (oldest first for proper calculation)
-            formatted_candles.sort(key=lambda x: x["time"])
+            # Sort by time (oldest first for proper calculation). The API returns a
+            # fixed order, so a reverse usually suffices; sort only if still unordered.
+            if formatted_candles[0]["time"] > formatted_candles[-1]["time"]:
+                formatted_candles.reverse()
+            times = [c["time"] for c in formatted_candles]
+            if not all(map(operator.le, times, times[1:])):
+                formatted_candles.sort(key=operator.itemgetter("time"))
             
             # Limit results to requested amount (from most recent)
             formatted_candles = formatted_candles[-limit:]
             
+            if cache_key is not None:
+                _candles_cache[cache_key] = (bucket, formatted_candles)
+                return [dict(c) for c in formatted_candles]
             return formatted_candles
         
         logger.error(f"❌ Failed to get candles: {response}")
         return None
         
     except Exception as e:
-        logger.error(f"❌ Exception getting candles: {e}")
-        import traceback
-        logger.error(traceback.format_exc())
+        logger.exception("❌ Exception getting candles: %s", e)
         return None
             
 
@@ -1,31 +1,41 @@
 """Market screener for fetching gainers/losers from Delta Exchange."""
+import heapq
 import logging
+from operator import itemgetter
 from database.crud import get_custom_list, update_custom_list
-from typing import List, Dict
+from typing import List, Dict, Optional
 from api.delta_client import DeltaExchangeClient
+from api.market_data import get_tickers_snapshot
 
 logger = logging.getLogger(__name__)
 
+# Perpetual-futures subset of the last tickers snapshot it was built from
+_perpetual_source: Optional[Dict[str, Dict]] = None
+_perpetual_tickers: List[Dict] = []
+
 
 async def get_all_perpetual_tickers(client: DeltaExchangeClient) -> List[Dict]:
     """
     Fetch all perpetual futures tickers from Delta Exchange.
     Returns list of tickers with 24h price change data.
     """
+    global _perpetual_source, _perpetual_tickers
     try:
-        response = await client._request("GET", "/v2/tickers")
-        if not response or not response.get("success"):
-            logger.error(f"Failed to fetch tickers: {response}")
+        tickers = await get_tickers_snapshot(client)
+        if not tickers:
+            logger.error("Failed to fetch tickers")
             return []
-            
-        tickers = response.get("result", [])
         
-        perpetual_tickers = [
-            t for t in tickers 
-            if t.get("contract_type") == "perpetual_futures"
-        ]
+        # Filter once per snapshot; screener calls within the TTL reuse it
+        if tickers is not _perpetual_source:
+            _perpetual_tickers = [
+                t for t in tickers.values()
+                if t.get("contract_type") == "perpetual_futures"
+            ]
+            _perpetual_source = tickers
+        perpetual_tickers = list(_perpetual_tickers)
         
-        logger.info(f"✅ Fetched {len(perpetual_tickers)} perpetual futures tickers")
+        logger.info("✅ Fetched %d perpetual futures tickers", len(perpetual_tickers))
         return perpetual_tickers
         
     except Exception as e:
@@ -33,6 +43,27 @@ async def get_all_perpetual_tickers(client: DeltaExchangeClient) -> List[Dict]:
         return []
 
 
+async def _get_asset_changes(client: DeltaExchangeClient) -> List[Dict]:
+    """Collect {symbol, change_pct} for perpetuals that report a 24h mark change."""
+    tickers = await get_all_perpetual_tickers(client)
+    
+    asset_changes = []
+    for ticker in tickers:
+        symbol = ticker.get("symbol")
+        if not symbol:
+            continue
+        
+        # Use ticker's 24h change if available; tickers without one are skipped
+        change_24h = ticker.get("mark_change_24h")
+        if change_24h is not None:
+            asset_changes.append({
+                "symbol": symbol,
+                "change_pct": float(change_24h)
+            })
+    
+    return asset_changes
+
+
 async def get_top_gainers(
     client: DeltaExchangeClient,
     timeframe: str,
@@ -40,30 +71,13 @@ async def get_top_gainers(
 ) -> List[str]:
     """Get top N gainers (highest 24h % increase)."""
     try:
-        tickers = await get_all_perpetual_tickers(client)
-        
         # Calculate % change for each
-        asset_changes = []
-        for ticker in tickers:
-            symbol = ticker.get("symbol")
-            if not symbol:
-                continue
-            
-            # Use ticker's 24h change if available
-            change_24h = ticker.get("mark_change_24h")
-            if change_24h is not None:
-                asset_changes.append({
-                    "symbol": symbol,
-                    "change_pct": float(change_24h)
-                })
-        
-        # Sort descending (highest gainers first)
-        asset_changes.sort(key=lambda x: x["change_pct"], reverse=True)
+        asset_changes = await _get_asset_changes(client)
         
-        # Get top N
-        top_gainers = [a["symbol"] for a in asset_changes[:top_n]]
+        # Top N descending (highest gainers first)
+        top_gainers = [a["symbol"] for a in heapq.nlargest(top_n, asset_changes, key=itemgetter("change_pct"))]
         
-        logger.info(f"📈 Top {top_n} Gainers: {top_gainers}")
+        logger.info("📈 Top %d Gainers: %s", top_n, top_gainers)
         return top_gainers
         
     except Exception as e:
@@ -78,27 +92,12 @@ async def get_top_losers(
 ) -> List[str]:
     """Get top N losers (highest 24h % decrease)."""
     try:
-        tickers = await get_all_perpetual_tickers(client)
-        
-        asset_changes = []
-        for ticker in tickers:
-            symbol = ticker.get("symbol")
-            if not symbol:
-                continue
-            
-            change_24h = ticker.get("mark_change_24h")
-            if change_24h is not None:
-                asset_changes.append({
-                    "symbol": symbol,
-                    "change_pct": float(change_24h)
-                })
+        asset_changes = await _get_asset_changes(client)
         
-        # Sort ascending (biggest losers first)
-        asset_changes.sort(key=lambda x: x["change_pct"])
+        # Top N ascending (biggest losers first)
+        top_losers = [a["symbol"] for a in heapq.nsmallest(top_n, asset_changes, key=itemgetter("change_pct"))]
         
-        top_losers = [a["symbol"] for a in asset_changes[:top_n]]
-        
-        logger.info(f"📉 Top {top_n} Losers: {top_losers}")
+        logger.info("📉 Top %d Losers: %s", top_n, top_losers)
         return top_losers
         
     except Exception as e:
@@ -111,7 +110,7 @@ async def get_all_perpetual_symbols(client: DeltaExchangeClient) -> List[str]:
     try:
         tickers = await get_all_perpetual_tickers(client)
         symbols = [t.get("symbol") for t in tickers if t.get("symbol")]
-        logger.info(f"📊 Found {len(symbols)} perpetual futures")
+        logger.info("📊 Found %d perpetual futures", len(symbols))
         return symbols
     except Exception as e:
         logger.error(f"❌ Error fetching all symbols: {e}")
@@ -140,16 +139,14 @@ async def get_top_volume(
                     "volume_usd": float(turnover_usd)
                 })
         
-        # Sort descending (highest volume first)
-        asset_volumes.sort(key=lambda x: x["volume_usd"], reverse=True)
-        
-        # Get top N
-        top_volume = [a["symbol"] for a in asset_volumes[:top_n]]
+        # Top N descending (highest volume first)
+        top_entries = heapq.nlargest(top_n, asset_volumes, key=itemgetter("volume_usd"))
+        top_volume = [a["symbol"] for a in top_entries]
         
-        logger.info(f"📊 Top {top_n} Volume: {top_volume}")
-        if asset_volumes[:top_n]:
-            for a in asset_volumes[:top_n]:
-                logger.debug(f"   {a['symbol']}: ${a['volume_usd']:,.0f}")
+        logger.info("📊 Top %d Volume: %s", top_n, top_volume)
+        if logger.isEnabledFor(logging.DEBUG):
+            for a in top_entries:
+                logger.debug("   %s: $%s", a["symbol"], format(a["volume_usd"], ",.0f"))
         return top_volume
         
     except Exception as e:
@@ -179,15 +176,14 @@ async def get_top_oi(
                     "oi_usd": float(oi_usd)
                 })
         
-        # Sort descending (highest OI first)
-        asset_oi.sort(key=lambda x: x["oi_usd"], reverse=True)
-        
-        top_oi = [a["symbol"] for a in asset_oi[:top_n]]
+        # Top N descending (highest OI first)
+        top_entries = heapq.nlargest(top_n, asset_oi, key=itemgetter("oi_usd"))
+        top_oi = [a["symbol"] for a in top_entries]
         
-        logger.info(f"🔝 Top {top_n} OI: {top_oi}")
-        if asset_oi[:top_n]:
-            for a in asset_oi[:top_n]:
-                logger.debug(f"   {a['symbol']}: ${a['oi_usd']:,.0f}")
+        logger.info("🔝 Top %d OI: %s", top_n, top_oi)
+        if logger.isEnabledFor(logging.DEBUG):
+            for a in top_entries:
+                logger.debug("   %s: $%s", a["symbol"], format(a["oi_usd"], ",.0f"))
         return top_oi
         
     except Exception as e:
@@ -253,7 +249,7 @@ async def get_assets_by_tag(
         else:
             result = [a["symbol"] for a in matched]
         
-        logger.info(f"🏷️ Tag '{tag}': {len(result)} assets found")
+        logger.info("🏷️ Tag '%s': %d assets found", tag, len(result))
         return result
         
     except Exception as e:
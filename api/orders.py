@@ -1,177 +1,292 @@
+import asyncio
 import logging
-from typing import Dict, Any, Optional, List
+import time
+from collections import OrderedDict
+from decimal import Decimal
+from functools import lru_cache
+from typing import Dict, Any, Optional, List, NamedTuple, Tuple
 from api.delta_client import DeltaExchangeClient
+from utils.helpers import safe_async
+from utils.market_utils import get_tick_size_str
+from api.positions import invalidate_positions_cache
 from config.constants import (
     ORDER_TYPE_MARKET, ORDER_TYPE_LIMIT, 
     ORDER_TYPE_STOP_LIMIT, ORDER_TYPE_STOP_MARKET,
-    ORDER_SIDE_BUY, ORDER_SIDE_SELL
+    ORDER_SIDE_BUY, ORDER_SIDE_SELL,
+    CANCEL_CONCURRENCY
 )
 
 logger = logging.getLogger(__name__)
 
+# Order types that carry a limit price and time_in_force
+_LIMIT_TYPES = frozenset({ORDER_TYPE_LIMIT, ORDER_TYPE_STOP_LIMIT})
+
+# Direction of the stop-limit slippage band per order side
+_SLIP_SIGN = {ORDER_SIDE_BUY: 1.0, ORDER_SIDE_SELL: -1.0}
+
+# Short-lived open-orders cache so back-to-back callers share one fetch:
+# (api_key, product_id, include_untriggered) -> (time.monotonic() fetched, orders)
+_orders_cache: Dict[tuple, Tuple[float, List[Dict[str, Any]]]] = {}
+_orders_inflight: Dict[tuple, asyncio.Future] = {}
+ORDERS_CACHE_TTL = 0.5
+
+# order_id -> time.monotonic() it was cancelled; lets duplicate cancels skip the API
+_recently_cancelled: "OrderedDict[int, float]" = OrderedDict()
+_RECENTLY_CANCELLED_TTL = 30
+_RECENTLY_CANCELLED_MAX = 1024
+
+# (api_key, order_id) -> (etag, order) of the last /v2/orders/{id} response, for conditional GETs
+_order_etags: "OrderedDict[tuple, Tuple[str, Dict[str, Any]]]" = OrderedDict()
+_ORDER_ETAGS_MAX = 1024
+
+
+def _invalidate_orders_cache(client: DeltaExchangeClient, product_id: Optional[int] = None) -> None:
+    """Drop cached and in-flight open-order lists that an order change makes stale.
+    
+    Clears the account's entries for product_id and its all-products entries
+    (every product when product_id is None).
+    """
+    for store in (_orders_cache, _orders_inflight):
+        for key in [k for k in store
+                    if k[0] == client.api_key and (product_id is None or k[1] in (product_id, None))]:
+            del store[key]
+
+@lru_cache(maxsize=4096)
+def _fmt_price(ticks: int, tick_size_str: str) -> str:
+    """Exact decimal string for a whole number of ticks (e.g. 200001 x "0.5" -> "100000.5")."""
+    return format(Decimal(ticks) * Decimal(tick_size_str), "f")
+
+def _price_str(product_id: int, price: float) -> str:
+    """Format a price for the API, snapped to the product's tick when it is known.
+    
+    str(float) can produce non-canonical values like "12345.67000000001"
+    that are off-tick; unknown products fall back to it.
+    """
+    tick_size_str = get_tick_size_str(product_id)
+    if not tick_size_str:
+        return str(price)
+    tick = float(tick_size_str)
+    if tick <= 0:
+        return str(price)
+    return _fmt_price(int(round(price / tick)), tick_size_str)
+
+@safe_async(default=None)
 async def place_order(client: DeltaExchangeClient, product_id: int, size: int, 
                      side: str, order_type: str = ORDER_TYPE_MARKET,
                      limit_price: Optional[float] = None, 
                      stop_price: Optional[float] = None,
                      stop_order_type: Optional[str] = None,
                      reduce_only: bool = False) -> Optional[Dict[str, Any]]:
-    try:
-        order_data = {
-            "product_id": product_id,
-            "size": size,
-            "side": side,
-            "order_type": order_type,
-            "reduce_only": reduce_only
-        }
+    is_limit = order_type in _LIMIT_TYPES
+    # One literal; optional fields are None here and dropped below
+    order_data = {k: v for k, v in {
+        "product_id": product_id,
+        "size": size,
+        "side": side,
+        "order_type": order_type,
+        "reduce_only": reduce_only,
         # time_in_force: only for limit-type orders (Delta rejects gtc on market/stop-market)
-        if order_type in (ORDER_TYPE_LIMIT, ORDER_TYPE_STOP_LIMIT):
-            order_data["time_in_force"] = "gtc"
-        if limit_price and order_type in (ORDER_TYPE_LIMIT, ORDER_TYPE_STOP_LIMIT):
-            order_data["limit_price"] = str(limit_price)
-        if stop_price:
-            order_data["stop_price"] = str(stop_price)
-        if stop_order_type:
-            order_data["stop_order_type"] = stop_order_type
-        response = await client.post("/v2/orders", order_data)
-        if response and response.get("success"):
-            order = response.get("result", {})
-            logger.info(f"✅ Order placed: {order_type} {side.upper()} {size} contracts")
+        "time_in_force": "gtc" if is_limit else None,
+        "limit_price": _price_str(product_id, limit_price) if limit_price and is_limit else None,
+        "stop_price": _price_str(product_id, stop_price) if stop_price else None,
+        "stop_order_type": stop_order_type or None
+    }.items() if v is not None}
+    return await _submit_order(client, order_data, limit_price, stop_price)
+
+async def _submit_order(client: DeltaExchangeClient, order_data: Dict[str, Any],
+                        limit_price: Optional[float] = None,
+                        stop_price: Optional[float] = None) -> Optional[Dict[str, Any]]:
+    """POST a ready-built order payload; shared by place_order and its specialized wrappers.
+    
+    Not guarded itself: callers are wrapped in safe_async, so a failure is logged once.
+    """
+    response = await client.post("/v2/orders", order_data)
+    if response and response.get("success"):
+        _invalidate_orders_cache(client, order_data["product_id"])
+        invalidate_positions_cache(client)
+        order = response.get("result", {})
+        if logger.isEnabledFor(logging.INFO):
+            logger.info("✅ Order placed: %s %s %s contracts",
+                        order_data["order_type"], order_data["side"].upper(), order_data["size"])
             if stop_price:
-                logger.info(f"   Stop trigger: ${stop_price}")
+                logger.info("   Stop trigger: $%s", stop_price)
             if limit_price:
-                logger.info(f"   Limit price: ${limit_price}")
-            return order
-        logger.error(f"❌ Failed to place order: {response}")
-        return None
-    except Exception as e:
-        logger.error(f"❌ Exception placing order: {e}")
-        import traceback
-        logger.error(traceback.format_exc())
-        return None
+                logger.info("   Limit price: $%s", limit_price)
+        return order
+    logger.error(f"❌ Failed to place order: {response}")
+    return None
 
+@safe_async(default=None)
 async def place_market_order(client: DeltaExchangeClient, product_id: int, 
                             size: int, side: str,
                             reduce_only: bool = False) -> Optional[Dict[str, Any]]:
-    return await place_order(client, product_id, size, side, ORDER_TYPE_MARKET,
-                             reduce_only=reduce_only)
+    # Market orders never carry time_in_force (Delta rejects it)
+    return await _submit_order(client, {
+        "product_id": product_id,
+        "size": size,
+        "side": side,
+        "order_type": ORDER_TYPE_MARKET,
+        "reduce_only": reduce_only
+    })
 
+@safe_async(default=None)
 async def place_stop_market_entry_order(client: DeltaExchangeClient, product_id: int,
                                         size: int, side: str, 
                                         stop_price: float) -> Optional[Dict[str, Any]]:
-    logger.info(f"🎯 Placing breakout entry: {side.upper()} stop-market @ ${stop_price}")
-    return await place_order(
-        client=client,
-        product_id=product_id,
-        size=size,
-        side=side,
-        order_type=ORDER_TYPE_MARKET,
-        stop_price=stop_price,
-        reduce_only=False
-    )
+    logger.info("🎯 Placing breakout entry: %s stop-market @ $%s", side.upper(), stop_price)
+    # Entry: market_order + stop_price, no stop_order_type, not reduce-only
+    return await _submit_order(client, {
+        "product_id": product_id,
+        "size": size,
+        "side": side,
+        "order_type": ORDER_TYPE_MARKET,
+        "reduce_only": False,
+        "stop_price": _price_str(product_id, stop_price)
+    }, stop_price=stop_price)
 
+@safe_async(default=None)
 async def place_stop_limit_entry_order(client: DeltaExchangeClient, product_id: int,
                                       size: int, side: str, 
                                       stop_price: float,
                                       slippage_pct: float = 0.005) -> Optional[Dict[str, Any]]:
-    if side == "buy":
-        limit_price = stop_price * (1 + slippage_pct)
-    else:
-        limit_price = stop_price * (1 - slippage_pct)
-    logger.info(f"🎯 Placing breakout entry: {side.upper()} stop-limit")
-    logger.info(f"   Stop: ${stop_price:.5f}")
-    logger.info(f"   Limit: ${limit_price:.5f}")
-    return await place_order(
-        client=client,
-        product_id=product_id,
-        size=size,
-        side=side,
-        order_type=ORDER_TYPE_LIMIT,
-        limit_price=limit_price,
-        stop_price=stop_price,
-        reduce_only=False
-    )
+    # Buys cap above the trigger, sells below; an unknown side raises KeyError
+    limit_price = stop_price * (1.0 + _SLIP_SIGN[side] * slippage_pct)
+    if logger.isEnabledFor(logging.INFO):
+        logger.info("🎯 Placing breakout entry: %s stop-limit", side.upper())
+        logger.info("   Stop: $%.5f", stop_price)
+        logger.info("   Limit: $%.5f", limit_price)
+    # Entry: limit_order + stop_price + limit_price, no stop_order_type
+    return await _submit_order(client, {
+        "product_id": product_id,
+        "size": size,
+        "side": side,
+        "order_type": ORDER_TYPE_LIMIT,
+        "reduce_only": False,
+        "time_in_force": "gtc",
+        "limit_price": _price_str(product_id, limit_price),
+        "stop_price": _price_str(product_id, stop_price)
+    }, limit_price, stop_price)
 
+@safe_async(default=None)
 async def place_stop_loss_order(client: DeltaExchangeClient, product_id: int,
                                 size: int, side: str, stop_price: float,
                                 use_stop_market: bool = True) -> Optional[Dict[str, Any]]:
+    stop_str = _price_str(product_id, stop_price)
     if use_stop_market:
-        logger.info(f"🛡️ Placing stop-loss: {side.upper()} stop-market @ ${stop_price}")
-        return await place_order(
-            client=client,
-            product_id=product_id,
-            size=size,
-            side=side,
-            order_type=ORDER_TYPE_MARKET,
-            stop_price=stop_price,
-            stop_order_type="stop_loss_order",
-            reduce_only=True
-        )
+        logger.info("🛡️ Placing stop-loss: %s stop-market @ $%s", side.upper(), stop_price)
+        return await _submit_order(client, {
+            "product_id": product_id,
+            "size": size,
+            "side": side,
+            "order_type": ORDER_TYPE_MARKET,
+            "reduce_only": True,
+            "stop_price": stop_str,
+            "stop_order_type": "stop_loss_order"
+        }, stop_price=stop_price)
     else:
-        return await place_order(
-            client=client,
-            product_id=product_id,
-            size=size,
-            side=side,
-            order_type=ORDER_TYPE_LIMIT,
-            limit_price=stop_price,
-            stop_price=stop_price,
-            stop_order_type="stop_loss_order",
-            reduce_only=True
-        )
+        return await _submit_order(client, {
+            "product_id": product_id,
+            "size": size,
+            "side": side,
+            "order_type": ORDER_TYPE_LIMIT,
+            "reduce_only": True,
+            "time_in_force": "gtc",
+            "limit_price": stop_str,
+            "stop_price": stop_str,
+            "stop_order_type": "stop_loss_order"
+        }, stop_price, stop_price)
 
 async def get_open_orders(client: DeltaExchangeClient, 
                          product_id: Optional[int] = None,
                          include_untriggered: bool = True) -> Optional[List[Dict[str, Any]]]:
+    """Get open (and by default untriggered) orders.
+    
+    Results are reused for ORDERS_CACHE_TTL seconds and concurrent callers
+    share one fetch; placing or cancelling an order invalidates the cache.
+    """
+    key = (client.api_key, product_id, include_untriggered)
+    cached = _orders_cache.get(key)
+    if cached is not None and time.monotonic() - cached[0] < ORDERS_CACHE_TTL:
+        return list(cached[1])
+    
+    pending = _orders_inflight.get(key)
+    if pending is not None:
+        result = await asyncio.shield(pending)
+        return list(result) if result is not None else None
+    
+    future = asyncio.get_running_loop().create_future()
+    _orders_inflight[key] = future
     try:
-        all_orders = []
-        params = {"state": "open"}
+        orders = await _fetch_open_orders(client, product_id, include_untriggered)
+    except asyncio.CancelledError:
+        future.cancel()
+        raise
+    else:
+        future.set_result(orders)
+        # Skip the store if an order change invalidated this fetch meanwhile
+        if orders is not None and _orders_inflight.get(key) is future:
+            _orders_cache[key] = (time.monotonic(), orders)
+        return list(orders) if orders is not None else None
+    finally:
+        if _orders_inflight.get(key) is future:
+            del _orders_inflight[key]
+
+@safe_async(default=None)
+async def _fetch_open_orders(client: DeltaExchangeClient, product_id: Optional[int],
+                             include_untriggered: bool) -> Optional[List[Dict[str, Any]]]:
+    """Fetch and label open orders from the API (see get_open_orders)."""
+    all_orders = []
+    states = ("open", "untriggered") if include_untriggered else ("open",)
+    requests = []
+    for state in states:
+        params = {"state": state}
         if product_id:
             params["product_id"] = product_id
-        response = await client.get("/v2/orders", params)
-        if response and response.get("success"):
-            open_orders = response.get("result", [])
-            logger.info(f"   Found {len(open_orders)} open orders")
-            all_orders.extend(open_orders)
+        requests.append(client.get("/v2/orders", params))
+    # Both states are independent lists; fetch them in one round trip
+    responses = await asyncio.gather(*requests, return_exceptions=True)
+    for state, response in zip(states, responses):
+        if isinstance(response, Exception):
+            logger.warning(f"⚠️ Failed to get {state} orders: {response}")
+        elif response and response.get("success"):
+            orders = response.get("result", [])
+            logger.info("   Found %d %s orders", len(orders), state)
+            all_orders.extend(orders)
         else:
-            logger.warning(f"⚠️ Failed to get open orders: {response}")
-        if include_untriggered:
-            logger.info(f"🔍 [STEP 2] Fetching UNTRIGGERED stop orders...")
-            params = {"state": "untriggered"}
-            if product_id:
-                params["product_id"] = product_id
-            response = await client.get("/v2/orders", params)
-            if response and response.get("success"):
-                untriggered_orders = response.get("result", [])
-                logger.info(f"   Found {len(untriggered_orders)} untriggered orders")
-                all_orders.extend(untriggered_orders)
-            else:
-                logger.warning(f"⚠️ Failed to get untriggered orders: {response}")
-        seen = set()
-        unique_orders = []
-        for order in all_orders:
-            order_id = order.get("id")
-            if order_id and order_id not in seen:
-                seen.add(order_id)
-                unique_orders.append(order)
-        for order in unique_orders:
-            label = None
-            stop_order_type = order.get("stop_order_type")
-            reduce_only = order.get("reduce_only")
-            order_type = order.get("order_type")
-            if reduce_only and stop_order_type == "stop_loss_order":
-                label = "Bracket - SL"
-            elif reduce_only and (stop_order_type == "take_profit_order" or order_type in ["limit_order", "market_order"]):
-                label = "Bracket - TP"
-            order["bracket_label"] = label
-        logger.info(f"✅ Total orders retrieved: {len(all_orders)}")
-        logger.info(f"✅ Unique orders after deduplication: {len(unique_orders)}")
-        return unique_orders if unique_orders else []
-    except Exception as e:
-        logger.error(f"❌ Exception getting open orders: {e}")
-        import traceback
-        logger.error(traceback.format_exc())
-        return None
+            logger.warning(f"⚠️ Failed to get {state} orders: {response}")
+    seen = set()
+    unique_orders = []
+    for order in all_orders:
+        order_id = order.get("id")
+        if order_id and order_id not in seen:
+            seen.add(order_id)
+            unique_orders.append(order)
+    for order in unique_orders:
+        label = None
+        stop_order_type = order.get("stop_order_type")
+        reduce_only = order.get("reduce_only")
+        order_type = order.get("order_type")
+        if reduce_only and stop_order_type == "stop_loss_order":
+            label = "Bracket - SL"
+        elif reduce_only and (stop_order_type == "take_profit_order" or order_type in ["limit_order", "market_order"]):
+            label = "Bracket - TP"
+        order["bracket_label"] = label
+    logger.info("✅ Total orders retrieved: %d", len(all_orders))
+    logger.info("✅ Unique orders after deduplication: %d", len(unique_orders))
+    return unique_orders if unique_orders else []
 
+def _mark_cancelled(order_id: int) -> None:
+    """Remember a cancelled order, evicting expired and overflow entries."""
+    now = time.monotonic()
+    _recently_cancelled[order_id] = now
+    _recently_cancelled.move_to_end(order_id)
+    while _recently_cancelled:
+        oldest_id, cancelled_at = next(iter(_recently_cancelled.items()))
+        if now - cancelled_at < _RECENTLY_CANCELLED_TTL and len(_recently_cancelled) <= _RECENTLY_CANCELLED_MAX:
+            break
+        del _recently_cancelled[oldest_id]
+
+@safe_async(default=False)
 async def cancel_order(client: DeltaExchangeClient, product_id: int, order_id: int) -> bool:
     """Cancel an order on Delta Exchange.
     
@@ -183,92 +298,247 @@ async def cancel_order(client: DeltaExchangeClient, product_id: int, order_id: i
     Returns:
         True if order was successfully cancelled, False otherwise
     """
-    try:
-        if isinstance(order_id, str):
-            order_id = int(order_id)
-        if isinstance(product_id, str):
-            product_id = int(product_id)
-        
-        # Delta Exchange requires DELETE /v2/orders with JSON body containing id and product_id
-        response = await client.delete("/v2/orders", json_data={
-            "id": order_id,
-            "product_id": product_id
-        })
-        
-        if response is None:
-            # None means non-200 status - cancellation FAILED
-            logger.warning(f"⚠️ Cancel order {order_id} returned None (API error)")
-            return False
-        
-        if isinstance(response, dict) and response.get("success"):
-            logger.info(f"✅ Order {order_id} cancelled via API")
-            return True
-        
-        # Log unexpected response
-        logger.warning(f"⚠️ Unexpected cancel response for {order_id}: {response}")
-        return False
-        
-    except Exception as e:
-        logger.error(f"❌ Cancel error for order {order_id}: {e}")
+    if isinstance(order_id, str):
+        order_id = int(order_id)
+    if isinstance(product_id, str):
+        product_id = int(product_id)
+    
+    # Reset paths often cancel the same order twice in quick succession
+    cancelled_at = _recently_cancelled.get(order_id)
+    if cancelled_at is not None and time.monotonic() - cancelled_at < _RECENTLY_CANCELLED_TTL:
+        logger.debug("Order %s already cancelled, skipping API call", order_id)
+        return True
+    
+    # Delta Exchange requires DELETE /v2/orders with JSON body containing id and product_id
+    response = await client.delete("/v2/orders", json_data={
+        "id": order_id,
+        "product_id": product_id
+    })
+    
+    if response is None:
+        # None means non-200 status - cancellation FAILED
+        logger.warning(f"⚠️ Cancel order {order_id} returned None (API error)")
         return False
+    
+    if isinstance(response, dict) and response.get("success"):
+        _invalidate_orders_cache(client, product_id)
+        _mark_cancelled(order_id)
+        logger.info("✅ Order %s cancelled via API", order_id)
+        return True
+    
+    # Log unexpected response
+    logger.warning(f"⚠️ Unexpected cancel response for {order_id}: {response}")
+    return False
 
-async def cancel_all_orders(client: DeltaExchangeClient, 
-                           product_id: Optional[int] = None) -> int:
-    try:
-        orders = await get_open_orders(client, product_id)
-        if not orders:
-            logger.info("ℹ️ No open orders to cancel")
-            return 0
-        cancelled_count = 0
-        for order in orders:
-            order_id = order.get("id")
-            ord_product_id = order.get("product_id") or product_id
-            if order_id and ord_product_id and await cancel_order(client, ord_product_id, order_id):
-                cancelled_count += 1
-        logger.info(f"✅ Cancelled {cancelled_count}/{len(orders)} orders")
-        return cancelled_count
-    except Exception as e:
-        logger.error(f"❌ Exception cancelling all orders: {e}")
+async def _cancel_bounded(sem: asyncio.Semaphore, client: DeltaExchangeClient,
+                          product_id: int, order_id: int) -> bool:
+    """cancel_order, holding one slot of sem."""
+    async with sem:
+        return await cancel_order(client, product_id, order_id)
+
+@safe_async(default=(False, None))
+async def cancel_all_orders_bulk(client: DeltaExchangeClient,
+                                product_id: Optional[int] = None) -> Tuple[bool, Optional[int]]:
+    """Cancel all open and untriggered orders (optionally for one product) in one call.
+    
+    The filter is applied server-side, so no order list is fetched first.
+    
+    Args:
+        client: DeltaExchangeClient instance
+        product_id: Limit the cancel to this product, or None for every product
+    
+    Returns:
+        (accepted, count): whether Delta accepted the bulk cancel, and the
+        number of orders cancelled (None if Delta did not report them)
+    """
+    body = {
+        "cancel_limit_orders": True,
+        "cancel_stop_orders": True,
+        "cancel_reduce_only_orders": True
+    }
+    if product_id:
+        body["product_id"] = int(product_id)
+    response = await client.delete("/v2/orders/all", json_data=body)
+    if isinstance(response, dict) and response.get("success"):
+        _invalidate_orders_cache(client, body.get("product_id"))
+        result = response.get("result")
+        return True, len(result) if isinstance(result, list) else None
+    logger.warning(f"⚠️ Bulk cancel rejected: {response}")
+    return False, None
+
+@safe_async(default=0)
+async def cancel_all_orders_individual(client: DeltaExchangeClient,
+                                       product_id: Optional[int] = None) -> int:
+    """Fetch open orders and cancel them one by one (concurrently).
+    
+    Args:
+        client: DeltaExchangeClient instance
+        product_id: Limit the cancel to this product, or None for every product
+    
+    Returns:
+        Number of orders cancelled
+    """
+    orders = await get_open_orders(client, product_id)
+    if not orders:
+        logger.info("ℹ️ No open orders to cancel")
         return 0
+    # Fire the DELETEs concurrently; the semaphore keeps bursts within rate limits
+    sem = asyncio.Semaphore(CANCEL_CONCURRENCY)
+    tasks = []
+    for order in orders:
+        order_id = order.get("id")
+        ord_product_id = order.get("product_id") or product_id
+        if order_id and ord_product_id:
+            tasks.append(_cancel_bounded(sem, client, ord_product_id, order_id))
+    results = await asyncio.gather(*tasks, return_exceptions=True)
+    cancelled_count = sum(1 for r in results if r is True)
+    logger.info("✅ Cancelled %d/%d orders", cancelled_count, len(orders))
+    return cancelled_count
+
+async def cancel_all_orders(client: DeltaExchangeClient, 
+                           product_id: Optional[int] = None,
+                           force_individual: bool = False) -> Optional[int]:
+    """Cancel all open orders, preferring Delta's server-side bulk cancel.
+    
+    Args:
+        client: DeltaExchangeClient instance
+        product_id: Limit the cancel to this product, or None for every product
+        force_individual: Skip the bulk endpoint and cancel order by order
+    
+    Returns:
+        Number of orders cancelled, or None when the bulk cancel succeeded
+        without reporting a count
+    """
+    if not force_individual:
+        # One DELETE /v2/orders/all, no fetch of the order list
+        accepted, cancelled = await cancel_all_orders_bulk(client, product_id)
+        if accepted:
+            logger.info("✅ Bulk cancel accepted (%s)",
+                        "all orders" if cancelled is None else f"{cancelled} orders")
+            return cancelled
+    return await cancel_all_orders_individual(client, product_id)
 
 # Legacy direct-by-id getter: use only for display/debug, NOT status detection!
+@safe_async(default=None)
 async def get_order_by_id(client: DeltaExchangeClient, order_id: int) -> Optional[Dict[str, Any]]:
-    try:
-        response = await client.get(f"/v2/orders/{order_id}")
-        if response and response.get("success"):
-            order = response.get("result", {})
-            return order
-        logger.error(f"❌ Failed to get order {order_id}: {response}")
+    """
+    Fetch one order, revalidating the last copy with If-None-Match.
+    
+    Poll loops on an unchanged order get a bodiless 304 and the cached order.
+    """
+    key = (client.api_key, order_id)
+    cached = _order_etags.get(key)
+    response = await client.get(f"/v2/orders/{order_id}", etag=cached[0] if cached else "")
+    if response and response.get("not_modified") and cached:
+        _order_etags.move_to_end(key)
+        return dict(cached[1])
+    if response and response.get("success"):
+        order = response.get("result", {})
+        if response.get("etag"):
+            # Store a copy: the caller owns the returned dict and may edit it
+            _order_etags[key] = (response["etag"], dict(order))
+            _order_etags.move_to_end(key)
+            if len(_order_etags) > _ORDER_ETAGS_MAX:
+                _order_etags.popitem(last=False)
+        else:
+            _order_etags.pop(key, None)
+        return order
+    logger.error(f"❌ Failed to get order {order_id}: {response}")
+    return None
+
+# Display labels for the known API values; anything else is formatted on the fly
+_SIDE_DISPLAY = {"buy": "Buy", "sell": "Sell"}
+_TYPE_DISPLAY = {
+    "market_order": "Market Order",
+    "limit_order": "Limit Order",
+    "stop_market_order": "Stop Market Order",
+    "stop_limit_order": "Stop Limit Order",
+}
+_STATE_DISPLAY = {
+    "open": "Open",
+    "pending": "Pending",
+    "untriggered": "Untriggered",
+    "triggered": "Triggered",
+    "closed": "Closed",
+    "cancelled": "Cancelled",
+    "filled": "Filled",
+}
+
+def _safe_f(x) -> Optional[float]:
+    """float(x) for a present, numeric value; None for missing or malformed."""
+    if not x:
         return None
-    except Exception as e:
-        logger.error(f"❌ Exception getting order: {e}")
+    try:
+        return float(x)
+    except (TypeError, ValueError):
         return None
 
-async def format_orders_display(orders: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+def _round2(x: Optional[float]) -> Optional[float]:
+    return round(x, 2) if x is not None else None
+
+class FormattedOrder(NamedTuple):
+    """Display-ready view of one open order."""
+    order_id: Optional[int]
+    product_id: Optional[int]
+    symbol: str
+    side: str                    # "Buy" / "Sell"
+    size: Any
+    order_type: str              # e.g. "Stop Market Order"
+    limit_price: Optional[float]
+    stop_price: Optional[float]
+    filled: Any                  # unfilled size as reported by Delta
+    status: str                  # e.g. "Open", "Untriggered"
+    reduce_only: bool
+    bracket_label: Optional[str]
+
+@lru_cache(maxsize=4096)
+def _format_one(order_id, product_id, symbol, side, size, order_type, limit_price,
+                stop_price, unfilled, state, reduce_only, bracket_label) -> FormattedOrder:
+    """Build the display record for one order. Memoized on its raw fields, so an
+    order that changed in any of them gets a fresh entry."""
+    return FormattedOrder(
+        order_id,
+        product_id,
+        symbol,
+        _SIDE_DISPLAY.get(side) or side.capitalize(),
+        size,
+        _TYPE_DISPLAY.get(order_type) or order_type.replace("_", " ").title(),
+        _round2(_safe_f(limit_price)),
+        _round2(_safe_f(stop_price)),
+        unfilled,
+        _STATE_DISPLAY.get(state) or state.capitalize(),
+        reduce_only,
+        bracket_label
+    )
+
+async def format_orders_display(orders: List[Dict[str, Any]]) -> List[FormattedOrder]:
+    format_one = _format_one
+    # Prices go through _safe_f and the label fields are coerced to str.
+    # The guard catches what remains (a non-dict product, or an unhashable
+    # value the lru_cache cannot key on) so one bad row is skipped instead
+    # of failing the whole listing. Records are immutable, so the memoized
+    # entries are shared with callers as-is.
     formatted = []
+    append = formatted.append
     for order in orders:
+        g = order.get
         try:
-            product = order.get("product", {})
-            symbol = product.get("symbol", "Unknown")
-            bracket_label = order.get("bracket_label")
-            formatted_order = {
-                "order_id": order.get("id"),
-                "product_id": order.get("product_id"),
-                "symbol": symbol,
-                "side": order.get("side", "").capitalize(),
-                "size": order.get("size", 0),
-                "order_type": order.get("order_type", "").replace("_", " ").title(),
-                "limit_price": round(float(order.get("limit_price", 0)), 2) if order.get("limit_price") else None,
-                "stop_price": round(float(order.get("stop_price", 0)), 2) if order.get("stop_price") else None,
-                "filled": order.get("unfilled_size", 0),
-                "status": order.get("state", "").capitalize(),
-                "reduce_only": order.get("reduce_only", False),
-                "bracket_label": bracket_label
-            }
-            formatted.append(formatted_order)
-        except Exception as e:
-            logger.error(f"❌ Error formatting order: {e}")
-            continue
+            append(format_one(
+                g("id"),
+                g("product_id"),
+                (g("product") or {}).get("symbol", "Unknown"),
+                str(g("side") or ""),
+                g("size", 0),
+                str(g("order_type") or ""),
+                g("limit_price"),
+                g("stop_price"),
+                g("unfilled_size", 0),
+                str(g("state") or ""),
+                g("reduce_only", False),
+                g("bracket_label")
+            ))
+        except (TypeError, AttributeError) as e:
+            logger.error(f"❌ Error formatting order {g('id')}: {e}")
     return formatted
 
 # ---- Robust order state functions, only use these for tracking! ----
@@ -311,10 +581,11 @@ async def get_order_status_by_id(client, order_id: int, product_id: int) -> str:
 
 async def is_order_gone(client, order_id, product_id):
     status = await get_order_status_by_id(client, order_id, product_id)
-    logger.info(f"[STARTUP] get_order_status_by_id({order_id},{product_id}) -> {status}")
+    logger.info("[STARTUP] get_order_status_by_id(%s,%s) -> %s", order_id, product_id, status)
     terminal_states = {"filled", "cancelled", "rejected", "not_found", "closed"}
     return status in terminal_states
 
+@safe_async(default=None)
 async def get_order_history(
     client: DeltaExchangeClient, 
     product_id: int, 
@@ -334,17 +605,11 @@ async def get_order_history(
     if state:
         params["state"] = state
 
-    try:
-        resp = await client.get("/v2/orders/history", params)
-        if resp and resp.get("success", False):
-            return resp.get("result", [])
-        logger.warning(f"Order history fetch failed: {resp}")
-        return None
-    except Exception as e:
-        logger.error(f"Exception getting order history: {e}")
-        import traceback
-        logger.error(traceback.format_exc())
-        return None
+    resp = await client.get("/v2/orders/history", params)
+    if resp and resp.get("success", False):
+        return resp.get("result", [])
+    logger.warning(f"Order history fetch failed: {resp}")
+    return None
         
 # DEPRECATED: Never use for SL/entry checks! Only keep for backward compatibility if legacy code exists.
 # async def check_stop_loss_filled(client: DeltaExchangeClient, stop_loss_order_id: Optional[int], product_id: int) -> bool:
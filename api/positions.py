@@ -1,10 +1,42 @@
 import asyncio
 import logging
-from typing import Dict, Any, Optional, List
+import random
+import re
+import time
+from typing import Dict, Any, Optional, List, NamedTuple, Tuple, Union
 from api.delta_client import DeltaExchangeClient
+from config.settings import settings
+from api.market_data import get_tickers_snapshot
+from utils.market_utils import get_contract_multiplier
+from utils.helpers import safe_async
 
 logger = logging.getLogger(__name__)
 
+# Max /v2/positions requests in flight in get_all_positions_for_assets
+POSITIONS_FETCH_CONCURRENCY = 5
+
+# (api_key, underlying) -> (time.monotonic() fetched, raw positions list, open positions by symbol)
+_positions_cache: Dict[tuple, tuple] = {}
+POSITIONS_CACHE_TTL = 1.5
+
+# (api_key, asset tuple or None) -> (time.monotonic() fetched, active positions)
+_all_positions_cache: Dict[tuple, tuple] = {}
+ALL_POSITIONS_CACHE_TTL = 1.0
+
+# Shared stand-in for a missing "product" dict; read-only, never mutated
+_EMPTY: Dict[str, Any] = {}
+
+# Quote-currency suffix of a contract symbol, and symbol -> underlying memo
+_QUOTE_SUFFIX = re.compile(r"(USDT|USD)$")
+_symbol_to_underlying: Dict[str, str] = {}
+
+# get_position_by_symbol retry backoff: base * 2**attempt, capped, plus up to base of jitter
+POSITION_RETRY_BASE_DELAY = 0.1
+POSITION_RETRY_MAX_DELAY = 2.0
+
+# Underlyings swept when the all-positions endpoint is unavailable
+DEFAULT_POSITION_ASSETS = ["BTC", "ETH", "SOL", "MATIC", "AVAX", "ADA", "ALGO", "DOT", "NEAR", "ARB"]
+
 def get_float_or_na(pos, *keys):
     for key in keys:
         if key in pos and pos[key] not in [None, ""]:
@@ -14,6 +46,25 @@ def get_float_or_na(pos, *keys):
                 continue
     return "N/A"
 
+def _underlying_for(symbol: str) -> str:
+    """Underlying asset of a contract symbol (BTCUSD -> BTC, BTCUSDT -> BTC), memoized."""
+    underlying = _symbol_to_underlying.get(symbol)
+    if underlying is None:
+        underlying = _symbol_to_underlying[symbol] = _QUOTE_SUFFIX.sub("", symbol)
+    return underlying
+
+def _position_symbol(position: Dict[str, Any]) -> str:
+    """Symbol of a position (Delta sends product_symbol and/or a product dict)."""
+    return position.get("product_symbol") or (position.get("product") or _EMPTY).get("symbol", "")
+
+def _is_active(position: Dict[str, Any]) -> bool:
+    """Whether a position has a non-zero size (missing/empty sizes count as closed)."""
+    return bool((size := position.get("size")) and float(size) != 0)
+
+def _active_positions(positions: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Keep only positions with a non-zero size."""
+    return [p for p in positions if (s := p.get("size")) and float(s) != 0]
+
 async def get_ticker_mark_price(client: DeltaExchangeClient, symbol: str) -> float:
     try:
         response = await client.get(f"/v2/tickers/{symbol}")
@@ -24,55 +75,96 @@ async def get_ticker_mark_price(client: DeltaExchangeClient, symbol: str) -> flo
         logger.warning(f"Could not fetch mark price for {symbol}: {e}")
         return 0.0
 
+@safe_async(default=[])
 async def get_all_positions_for_assets(client: DeltaExchangeClient, assets: List[str] = None) -> Optional[List[Dict[str, Any]]]:
+    """
+    Get all open positions.
+    
+    Without an explicit asset list, one /v2/positions/margined call returns
+    every open position; the per-underlying sweep over DEFAULT_POSITION_ASSETS
+    is only used if that call fails. Results are reused for
+    ALL_POSITIONS_CACHE_TTL seconds per account and asset list.
+    """
+    cache_key = (client.api_key, tuple(assets) if assets is not None else None)
+    cached = _all_positions_cache.get(cache_key)
+    if cached is not None and time.monotonic() - cached[0] < ALL_POSITIONS_CACHE_TTL:
+        return list(cached[1])
+    
+    all_positions = None
     if assets is None:
-        assets = ["BTC", "ETH", "SOL", "MATIC", "AVAX", "ADA", "ALGO", "DOT", "NEAR", "ARB"]
-    try:
+        response = await client.get("/v2/positions/margined")
+        if response and response.get("success"):
+            all_positions = _active_positions(response.get("result", []))
+        else:
+            logger.debug("Margined positions unavailable, sweeping assets: %s", response)
+            assets = DEFAULT_POSITION_ASSETS
+    
+    if all_positions is None:
+        # Bound the fan-out so a long asset list does not burst past the rate limit
+        sem = asyncio.Semaphore(POSITIONS_FETCH_CONCURRENCY)
+        
         # Define the async fetcher for one asset
         async def fetch_positions(asset):
             try:
-                logger.debug(f"Querying positions for {asset}...")
-                response = await client.get("/v2/positions", params={"underlying_asset_symbol": asset})
+                logger.debug("Querying positions for %s...", asset)
+                async with sem:
+                    response = await client.get("/v2/positions", params={"underlying_asset_symbol": asset})
                 if response and response.get("success"):
-                    positions = response.get("result", [])
-                    active_positions = [
-                        p for p in positions
-                        if p.get("size") and abs(float(p.get("size", 0))) > 0
-                    ]
+                    active_positions = _active_positions(response.get("result", []))
                     if active_positions:
-                        logger.debug(f"Found {len(active_positions)} positions for {asset}")
+                        logger.debug("Found %d positions for %s", len(active_positions), asset)
                     return active_positions
             except Exception as e:
-                logger.debug(f"Error querying {asset}: {e}")
+                logger.debug("Error querying %s: %s", asset, e)
             return []
 
         # Launch all fetches in parallel
-        all_results = await asyncio.gather(*(fetch_positions(asset) for asset in assets))
-        # Flatten the results
-        all_positions = [pos for sublist in all_results for pos in sublist]
-
-        if all_positions:
-            logger.info(f"Retrieved {len(all_positions)} total open positions")
-            for pos in all_positions:
-                symbol = pos.get("product", {}).get("symbol", "Unknown")
-                size = pos.get("size", 0)
-                logger.info(f"{symbol}: {size} contracts")
-        else:
-            logger.info("No open positions found")
-        return all_positions
-    except Exception as e:
-        logger.error(f"Exception getting positions: {e}")
-        import traceback
-        logger.error(traceback.format_exc())
-        return []
+        all_results = await asyncio.gather(*(fetch_positions(asset) for asset in assets),
+                                           return_exceptions=True)
+        # Flatten the results (a failed asset contributes nothing)
+        all_positions = [pos for sublist in all_results
+                         if not isinstance(sublist, BaseException) for pos in sublist]
+
+    if all_positions:
+        if logger.isEnabledFor(logging.INFO):
+            # One record for the whole list rather than one per position
+            summary = "\n".join(f"   {_position_symbol(pos) or 'Unknown'}: {pos.get('size', 0)} contracts"
+                                for pos in all_positions)
+            logger.info("Retrieved %d total open positions:\n%s", len(all_positions), summary)
+    else:
+        logger.info("No open positions found")
+    _all_positions_cache[cache_key] = (time.monotonic(), all_positions)
+    return list(all_positions)
 
-async def format_positions_display(positions: List[Dict[str, Any]], client: DeltaExchangeClient) -> List[Dict[str, Any]]:
+class FormattedPosition(NamedTuple):
+    """Display-ready view of one open position ("N/A" where Delta sent no margin)."""
+    symbol: str
+    size: float
+    side: str                    # "Long" / "Short"
+    entry_price: float
+    current_price: float
+    margin: Union[float, str]
+    margin_inr: Union[float, str]
+    pnl: float
+    pnl_inr: float
+    pnl_percentage: float
+
+def _safe_round(val, places):
+    """Round floats; pass "N/A" placeholders through unchanged."""
+    if isinstance(val, float):
+        return round(val, places)
+    return val
+
+async def format_positions_display(positions: List[Dict[str, Any]], client: DeltaExchangeClient) -> List[FormattedPosition]:
+    # One shared tickers snapshot serves every row; per-symbol GETs only for misses
+    tickers = await get_tickers_snapshot(client)
+    usd_to_inr = settings.usd_to_inr_rate
     formatted = []
     for pos in positions:
         try:
             symbol = (
                 pos.get("product_symbol") or
-                (pos.get("product", {}) or {}).get("symbol") or
+                (pos.get("product") or _EMPTY).get("symbol") or
                 pos.get("symbol") or
                 "Unknown"
             )
@@ -81,12 +173,15 @@ async def format_positions_display(positions: List[Dict[str, Any]], client: Delt
             if size == 0 or symbol == "Unknown":
                 continue
 
-            # Fetch mark price with fallback to entry price if not available
-            mark_price = await get_ticker_mark_price(client, symbol)
+            # Mark price with fallback to entry price if not available
+            ticker = tickers.get(symbol)
+            if ticker is not None:
+                mark_price = float(ticker.get("mark_price") or 0)
+            else:
+                mark_price = await get_ticker_mark_price(client, symbol)
             if not mark_price:
                 mark_price = entry_price
 
-            from utils.market_utils import get_contract_multiplier
             lot_size = get_contract_multiplier(symbol)
 
             # Manual PnL calculation
@@ -106,115 +201,178 @@ async def format_positions_display(positions: List[Dict[str, Any]], client: Delt
             if isinstance(margin, float) and margin == 0:
                 margin = "N/A"
 
-            def safe_round(val, places):
-                if isinstance(val, float):
-                    return round(val, places)
-                return val
-
-            formatted_pos = {
-                "symbol": symbol,
-                "size": size,
-                "side": "Long" if size > 0 else "Short",
-                "entry_price": safe_round(entry_price, 5),
-                "current_price": safe_round(mark_price, 5),
-                "margin": safe_round(margin, 2),
-                "margin_inr": safe_round(margin * 85 if isinstance(margin, float) else margin, 2),
-                "pnl": round(pnl, 4),
-                "pnl_inr": round(pnl * 85, 2),
-                "pnl_percentage": round(pnl_percentage, 2)
-            }
+            formatted_pos = FormattedPosition(
+                symbol=symbol,
+                size=size,
+                side="Long" if size > 0 else "Short",
+                entry_price=_safe_round(entry_price, 5),
+                current_price=_safe_round(mark_price, 5),
+                margin=_safe_round(margin, 2),
+                margin_inr=_safe_round(margin * usd_to_inr if isinstance(margin, float) else margin, 2),
+                pnl=round(pnl, 4),
+                pnl_inr=round(pnl * usd_to_inr, 2),
+                pnl_percentage=round(pnl_percentage, 2)
+            )
             formatted.append(formatted_pos)
         except Exception as e:
             logger.error(f"Error formatting position: {e}, original: {pos}")
             continue
     return formatted
 
+async def _fetch_for_account(cred) -> tuple:
+    """Positions block for one account: (message fragment, positions shown)."""
+    api_name = cred.get('api_name') or cred.get('api_label') or cred.get('apikey', '')[:6] + "..."
+    api_key = cred.get('api_key') or cred.get('apikey') or cred.get('apiKey')
+    api_secret = cred.get('api_secret') or cred.get('apisecret') or cred.get('apiSecret')
+    logger.debug("Credentials debug: api_name=%s", cred.get('api_name', 'N/A'))
+    if not api_key or not api_secret:
+        return f"❌ Error fetching for {api_name}: missing API key or secret\n\n", 0
+    try:
+        async with DeltaExchangeClient(api_key, api_secret) as client:
+            positions = await get_all_positions_for_assets(client)
+            formatted = await format_positions_display(positions, client)
+        message = f"=== Account: **{api_name}** ===\n"
+        if not formatted:
+            return message + "No open positions.\n\n", 0
+        for pos in formatted:
+            entry_str = f"${pos.entry_price}" if pos.entry_price != "N/A" else "N/A"
+            mark_str = f"${pos.current_price}" if pos.current_price != "N/A" else "N/A"
+            margin_str = f"${pos.margin}" if pos.margin != "N/A" else "N/A"
+            margin_inr_str = f"(₹{pos.margin_inr})" if pos.margin_inr != "N/A" else ""
+            pnl_str = f"${pos.pnl}" if pos.pnl != "N/A" else "N/A"
+            pnl_inr_str = f"(₹{pos.pnl_inr})" if pos.pnl_inr != "N/A" else ""
+            pnl_pct_str = f"{pos.pnl_percentage}%" if pos.pnl_percentage != "N/A" else "N/A"
+            message += (
+                f"• {pos.symbol} ({pos.side}) | Size: {pos.size}\n"
+                f"  Entry: {entry_str} | Mark: {mark_str}\n"
+                f"  Margin: {margin_str} {margin_inr_str}\n"
+                f"  PnL: {pnl_str} {pnl_inr_str} | %: {pnl_pct_str}\n"
+                "-------------------------\n"
+            )
+        return message + "\n", len(formatted)
+    except Exception as e:
+        return f"❌ Error fetching for {api_name}: {str(e)[:40]}\n\n", 0
+
 async def display_positions_for_all_apis(credentials):
     message = "📊 *Open Positions Across All APIs*\n\n"
-    total_positions = 0
-    for cred in credentials:
-        api_name = cred.get('api_name') or cred.get('api_label') or cred.get('apikey', '')[:6] + "..."
-        api_key = cred.get('api_key') or cred.get('apikey') or cred.get('apiKey')
-        api_secret = cred.get('api_secret') or cred.get('apisecret') or cred.get('apiSecret')
-        logger.debug(f"Credentials debug: api_name={cred.get('api_name', 'N/A')}")
-        if not api_key or not api_secret:
-            message += f"❌ Error fetching for {api_name}: missing API key or secret\n\n"
-            continue
-        try:
-            client = DeltaExchangeClient(api_key, api_secret)
-            try:
-                positions = await get_all_positions_for_assets(client)
-                formatted = await format_positions_display(positions, client)
-            finally:
-                await client.close()
-            message += f"=== Account: **{api_name}** ===\n"
-            if not formatted:
-                message += "No open positions.\n\n"
-                continue
-            for pos in formatted:
-                entry_str = f"${pos['entry_price']}" if pos['entry_price'] != "N/A" else "N/A"
-                mark_str = f"${pos['current_price']}" if pos['current_price'] != "N/A" else "N/A"
-                margin_str = f"${pos['margin']}" if pos['margin'] != "N/A" else "N/A"
-                margin_inr_str = f"(₹{pos['margin_inr']})" if pos['margin_inr'] != "N/A" else ""
-                pnl_str = f"${pos['pnl']}" if pos['pnl'] != "N/A" else "N/A"
-                pnl_inr_str = f"(₹{pos['pnl_inr']})" if pos['pnl_inr'] != "N/A" else ""
-                pnl_pct_str = f"{pos['pnl_percentage']}%" if pos['pnl_percentage'] != "N/A" else "N/A"
-                message += (
-                    f"• {pos['symbol']} ({pos['side']}) | Size: {pos['size']}\n"
-                    f"  Entry: {entry_str} | Mark: {mark_str}\n"
-                    f"  Margin: {margin_str} {margin_inr_str}\n"
-                    f"  PnL: {pnl_str} {pnl_inr_str} | %: {pnl_pct_str}\n"
-                    "-------------------------\n"
-                )
-                total_positions += 1
-            message += "\n"
-        except Exception as e:
-            message += f"❌ Error fetching for {api_name}: {str(e)[:40]}\n\n"
+    # Accounts are independent, so fetch them all at once; gather keeps their order
+    results = await asyncio.gather(*(_fetch_for_account(cred) for cred in credentials))
+    message += "".join(fragment for fragment, _ in results)
+    total_positions = sum(count for _, count in results)
     if total_positions == 0:
         message += "ℹ️ No open positions across all accounts.\n"
     return message
 
-async def get_position_by_symbol(client: DeltaExchangeClient, symbol: str, retry_count: int = 3) -> Optional[Dict[str, Any]]:
-    import asyncio
+def invalidate_positions_cache(client: Optional[DeltaExchangeClient] = None) -> None:
+    """Forget cached position lists for one account (or all accounts)."""
+    for store in (_positions_cache, _all_positions_cache):
+        if client is None:
+            store.clear()
+            continue
+        for key in [k for k in store if k[0] == client.api_key]:
+            del store[key]
+
+async def _get_underlying_entry(client: DeltaExchangeClient, underlying_asset: str,
+                                use_cache: bool = True) -> Optional[tuple]:
+    """
+    Cache entry for one underlying, reused for POSITIONS_CACHE_TTL seconds.
+    
+    Back-to-back checks on the same account (entry guard, exit, reconcile)
+    share one /v2/positions call. Returns None if the request failed.
+    """
+    key = (client.api_key, underlying_asset)
+    if use_cache:
+        cached = _positions_cache.get(key)
+        if cached is not None and time.monotonic() - cached[0] < POSITIONS_CACHE_TTL:
+            return cached
+    
+    response = await client.get("/v2/positions", params={"underlying_asset_symbol": underlying_asset})
+    if not response or not response.get("success"):
+        return None
+    positions = response.get("result", [])
+    # Reversed so the first listed position wins if a symbol repeats
+    by_symbol = {_position_symbol(p): p for p in reversed(positions) if _is_active(p)}
+    entry = _positions_cache[key] = (time.monotonic(), positions, by_symbol)
+    return entry
+
+async def get_positions_by_symbol_map(client: DeltaExchangeClient, underlying_asset: str,
+                                      use_cache: bool = True) -> Optional[Dict[str, Dict[str, Any]]]:
+    """
+    Open positions for one underlying, indexed by contract symbol.
+    
+    The index is built once per fetch and shared through the positions
+    cache, so looking up many symbols of one underlying is O(1) each.
+    Returns None if the request failed.
+    """
+    entry = await _get_underlying_entry(client, underlying_asset, use_cache)
+    return entry[2] if entry is not None else None
+
+def _retry_delay(attempt: int) -> float:
+    """Exponential backoff with jitter before retry number attempt + 1."""
+    return (min(POSITION_RETRY_BASE_DELAY * 2 ** attempt, POSITION_RETRY_MAX_DELAY)
+            + random.uniform(0, POSITION_RETRY_BASE_DELAY))
+
+async def get_position_by_symbol(client: DeltaExchangeClient, symbol: str, retry_count: int = 3,
+                                 use_cache: bool = True) -> Optional[Dict[str, Any]]:
+    """
+    Open position for symbol, or None if there is none.
+    
+    Args:
+        client: Delta Exchange client instance
+        symbol: Contract symbol (e.g. "BTCUSD")
+        retry_count: Attempts before giving up
+        use_cache: Let the first attempt reuse a positions list up to
+            POSITIONS_CACHE_TTL old; pass False where a stale answer could
+            miss a stop-loss fill or a flipped position
+    """
     for attempt in range(retry_count):
+        last_attempt = attempt == retry_count - 1
         try:
-            underlying_asset = symbol.replace("USD", "").replace("USDT", "")
-            logger.info(f"Attempt {attempt + 1}: Querying positions for symbol='{symbol}', underlying_asset='{underlying_asset}'")
-            response = await client.get("/v2/positions", params={"underlying_asset_symbol": underlying_asset})
-            logger.info(f"API response for {underlying_asset}: {response}")
+            underlying_asset = _underlying_for(symbol)
+            logger.info("Attempt %d: Querying positions for symbol='%s', underlying_asset='%s'",
+                        attempt + 1, symbol, underlying_asset)
+            # Only the first attempt may reuse a cached list; retries always hit the API
+            by_symbol = await get_positions_by_symbol_map(client, underlying_asset,
+                                                          use_cache=use_cache and attempt == 0)
 
-            if not response or not response.get("success"):
+            if by_symbol is None:
                 logger.warning(f"No valid response for {underlying_asset}; retrying.")
-                if attempt < retry_count - 1:
-                    await asyncio.sleep(0.5)
-                    continue
-                raise Exception(f"Failed to fetch position for {symbol} after {retry_count} attempts: {response}")
-
-            positions = response.get("result", [])
-            logger.info(f"Positions returned for {underlying_asset}: {positions}")
-
-            for position in positions:
-                # Delta returns 'product' dict with 'symbol'
-                position_symbol = position.get("product_symbol") or position.get("product", {}).get("symbol", "")
-                position_size = float(position.get("size", 0))
-                logger.info(f"Checking position: symbol={position_symbol}, size={position_size}")
-                # Symbol must match _and_ position size must be nonzero/open
-                if position_symbol == symbol and abs(position_size) > 0:
-                    logger.info(f"Match found: {position}")
-                    return position
-
-            logger.info(f"No matching open position found for symbol: {symbol} in attempt {attempt + 1}")
-
-            if attempt < retry_count - 1:
-                await asyncio.sleep(0.5)
-                continue
-            return None
+                if last_attempt:
+                    raise Exception(f"Failed to fetch position for {symbol} after {retry_count} attempts")
+            else:
+                # The map only holds open (non-zero size) positions
+                match = by_symbol.get(symbol)
+                if match is not None:
+                    logger.info("Match found for %s: size=%s", symbol, match.get("size"))
+                    return match
+
+                if logger.isEnabledFor(logging.INFO):
+                    available = [(sym, p.get("size")) for sym, p in by_symbol.items()]
+                    logger.info("No matching open position found for symbol: %s in attempt %d; available: %s",
+                                symbol, attempt + 1, available)
+                if last_attempt:
+                    return None
         except Exception as e:
             logger.error(f"Exception for {symbol} (attempt {attempt + 1}): {e}")
-            if attempt < retry_count - 1:
-                await asyncio.sleep(0.5)
-                continue
-            raise Exception(f"Exception fetching position for {symbol} after {retry_count} attempts: {e}")
+            if last_attempt:
+                raise Exception(f"Exception fetching position for {symbol} after {retry_count} attempts: {e}")
+
+        await asyncio.sleep(_retry_delay(attempt))
     
-    logger.info(f"Finished all retries; no open position found for {symbol}")
+    logger.info("Finished all retries; no open position found for %s", symbol)
     return None
+
+async def get_position_snapshot(client: DeltaExchangeClient, symbol: str,
+                                retry_count: int = 3,
+                                use_cache: bool = True) -> Tuple[Optional[Dict[str, Any]], float, bool]:
+    """
+    One lookup answering "which position, what size, is it open" for symbol.
+    
+    use_cache is passed to get_position_by_symbol.
+    
+    Returns:
+        (position or None, signed size, whether the position is open)
+    """
+    position = await get_position_by_symbol(client, symbol, retry_count=retry_count, use_cache=use_cache)
+    size = float(position.get("size") or 0) if position else 0.0
+    return position, size, size != 0
@@ -120,6 +120,7 @@ SIGNAL_DOWNTREND = -1                           # SuperTrend = Upper Band
 MAX_REQUESTS_PER_SECOND = 10                    # Delta Exchange API limit
 REQUEST_RETRY_ATTEMPTS = 3                      # Retries on API failure
 REQUEST_RETRY_DELAY = 2                         # Seconds between retries
+CANCEL_CONCURRENCY = 8                          # Max cancel requests in flight (below pool/rate limits)
 
 # ===== DATA RETENTION =====
 ALGO_ACTIVITY_RETENTION_DAYS = 3               # Clean up old activity logs
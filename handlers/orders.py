@@ -69,26 +69,26 @@ async def orders_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
                     message += f"✅ **{api_name}** ({len(formatted)} order(s))\n\n"
                     
                     for order in formatted:
-                        order_id = order['order_id']
-                        product_id = order.get('product_id', 0)
-                        if order.get('bracket_label'):
-                            message += f"🏷️ {order['bracket_label']}\n"
-                        message += f"📝 **{order['symbol']}** - {order['side']}\n"
-                        message += f"├ Type: {order['order_type']}\n"
-                        message += f"├ Size: {order['size']} contracts\n"
+                        order_id = order.order_id
+                        product_id = order.product_id or 0
+                        if order.bracket_label:
+                            message += f"🏷️ {order.bracket_label}\n"
+                        message += f"📝 **{order.symbol}** - {order.side}\n"
+                        message += f"├ Type: {order.order_type}\n"
+                        message += f"├ Size: {order.size} contracts\n"
                         
-                        if order['limit_price']:
-                            message += f"├ Price: ${order['limit_price']}\n"
+                        if order.limit_price:
+                            message += f"├ Price: ${order.limit_price}\n"
                         
-                        if order['reduce_only']:
+                        if order.reduce_only:
                             message += f"├ 🛡️ Reduce Only (Stop-Loss)\n"
                         
-                        message += f"└ Status: {order['status']}\n\n"
+                        message += f"└ Status: {order.status}\n\n"
                         
                         # Add cancel button (includes product_id)
                         keyboard.append([
                             InlineKeyboardButton(
-                                f"❌ Cancel Order {order['symbol']} ({order['side']})",
+                                f"❌ Cancel Order {order.symbol} ({order.side})",
                                 callback_data=f"order_cancel_{cred_id}_{order_id}_{product_id}"
                             )
                         ])
@@ -228,8 +228,9 @@ async def order_cancel_all_callback(update: Update, context: ContextTypes.DEFAUL
         cancelled_count = await cancel_all_orders(client)
         await client.close()
         
+        cancelled_text = "all open orders" if cancelled_count is None else f"{cancelled_count} order(s)"
         await query.edit_message_text(
-            f"✅ Cancelled {cancelled_count} order(s) successfully.\n\n"
+            f"✅ Cancelled {cancelled_text} successfully.\n\n"
             f"Use /start to return to main menu."
         )
     
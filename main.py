@@ -277,6 +277,11 @@ async def lifespan(app: FastAPI):
         await mongodb.close_db()
         logger.info("✅ MongoDB connection closed")
         
+        # Close the Delta Exchange connection pool shared by all API clients
+        from api.delta_client import close_shared_http
+        await close_shared_http()
+        logger.info("✅ Delta Exchange HTTP pool closed")
+        
         # Send shutdown notification
         if logger_bot:
             try:
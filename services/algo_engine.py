@@ -19,7 +19,7 @@ from api.orders import is_order_gone, cancel_order
 from strategy.factory import StrategyFactory
 from strategy.position_manager import PositionManager
 from strategy.paper_trader import paper_trader, is_paper_trade
-from api.positions import get_ticker_mark_price, get_position_by_symbol
+from api.positions import get_ticker_mark_price, get_position_snapshot
 from services.logger_bot import LoggerBot
 from utils.timeframe import (
     is_at_candle_boundary,
@@ -474,9 +474,8 @@ class AlgoEngine:
             # Catches manual closes, liquidations, and external interference immediately
             # instead of waiting for the 60s reconciler cycle.
             if not trade_state.get("is_paper_trade"):
-                actual_pos = await get_position_by_symbol(client, asset, retry_count=1)
-                actual_size = float(actual_pos.get("size", 0)) if actual_pos else 0
-                if actual_size == 0:
+                _, _, is_open = await get_position_snapshot(client, asset, retry_count=1)
+                if not is_open:
                     logger.warning(f"⚠️ Position {asset} no longer exists on exchange. Syncing DB.")
                     # Try to find actual exit price from recent order history
                     exit_price = await self._find_external_close_price(client, trade_state)
@@ -1,5 +1,6 @@
 """Data fetching service for historical and live data."""
 import logging
+import time
 from typing import List, Dict, Any, Optional
 from datetime import datetime, timedelta
 from api.delta_client import DeltaExchangeClient
@@ -34,7 +35,7 @@ class DataFetcher:
         try:
             # Calculate time range
             seconds_per_candle = TIMEFRAME_SECONDS.get(timeframe, 900)
-            end_time = int(datetime.utcnow().timestamp())
+            end_time = int(time.time())
             start_time = end_time - (seconds_per_candle * num_candles)
             
             # Fetch candles
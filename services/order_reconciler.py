@@ -75,7 +75,7 @@ async def reconcile_pending_orders(logger_bot=None):
                 
                 # Check 2: Position closed externally (manual close, liquidation, etc.)?
                 from api.positions import get_position_by_symbol
-                actual_position = await get_position_by_symbol(client, symbol)
+                actual_position = await get_position_by_symbol(client, symbol, use_cache=False)
                 actual_size = actual_position.get("size", 0) if actual_position else 0
                 
                 # Detect direction flip: exchange has opposite position to what bot expects
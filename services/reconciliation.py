@@ -56,7 +56,7 @@ async def startup_reconciliation(logger_bot: LoggerBot):
         
         try:
             if trade["status"] == "open":
-                pos = await get_position_by_symbol(client, symbol)
+                pos = await get_position_by_symbol(client, symbol, use_cache=False)
                 pos_size = pos.get("size", 0) if pos else 0
                 
                 # Detect direction flip: exchange has opposite position to what bot expects
@@ -23,6 +23,7 @@ Pending Order Invalidation:
 """
 
 import logging
+import time
 import numpy as np
 import pandas as pd
 import traceback
@@ -147,7 +148,7 @@ class DonchianBreakoutStrategy(BaseStrategy):
 
         latest_candle = candles[-1]
         candle_time = latest_candle.get("time", 0)
-        current_time = int(datetime.utcnow().timestamp())
+        current_time = int(time.time())
 
         timeframe_seconds = TIMEFRAME_SECONDS.get(timeframe, 180)
         candle_close_time = candle_time + timeframe_seconds
@@ -203,7 +204,7 @@ class DonchianBreakoutStrategy(BaseStrategy):
                     return None
     
                 # Step 2: Fetch full candle history
-                end_time = int(datetime.utcnow().timestamp())
+                end_time = int(time.time())
                 start_time = end_time - int(timeframe_seconds * required_candles * 1.2)
                 candles = await get_candles(
                     client, symbol, timeframe,
@@ -13,6 +13,7 @@ Exit Logic:
 """
 
 import logging
+import time
 import traceback
 from typing import Dict, Any, Optional, List
 from datetime import datetime
@@ -133,7 +134,7 @@ class DualSuperTrendStrategy(BaseStrategy):
 
         latest_candle = candles[-1]
         candle_time = latest_candle.get("time", 0)
-        current_time = int(datetime.utcnow().timestamp())
+        current_time = int(time.time())
 
         timeframe_seconds = TIMEFRAME_SECONDS.get(timeframe, 180)
         candle_close_time = candle_time + timeframe_seconds
@@ -195,7 +196,7 @@ class DualSuperTrendStrategy(BaseStrategy):
     
                 # Efficient Step 2: Fetch ALL candles
                 logger.info(f"FETCHING FRESH candles: {required_candles} candles for {symbol} ({timeframe})")
-                end_time = int(datetime.utcnow().timestamp())
+                end_time = int(time.time())
                 start_time = end_time - int(timeframe_seconds * required_candles * 1.2)
                 candles = await get_candles(client, symbol, timeframe, start_time=start_time, end_time=end_time, limit=required_candles)
 
@@ -3,6 +3,7 @@ Evasive SuperTrend breakout strategy.
 Conforms to BaseStrategy interface for modular engine execution.
 """
 import logging
+import time
 from typing import Dict, Any, Optional, List
 from datetime import datetime
 import numpy as np
@@ -95,7 +96,7 @@ class EvasiveSuperTrendStrategy(BaseStrategy):
 
         latest_candle = candles[-1]
         candle_time = latest_candle.get("time", 0)
-        current_time = int(datetime.utcnow().timestamp())
+        current_time = int(time.time())
         timeframe_seconds = TIMEFRAME_SECONDS.get(timeframe, 180)
         
         ready_time = candle_time + timeframe_seconds + CANDLE_CLOSE_BUFFER_SECONDS
@@ -126,7 +127,7 @@ class EvasiveSuperTrendStrategy(BaseStrategy):
                 latest_candles = await get_candles(client, symbol, timeframe, limit=2)
                 if not latest_candles: return None
                 
-                end_time = int(datetime.utcnow().timestamp())
+                end_time = int(time.time())
                 start_time = end_time - int(timeframe_seconds * required_candles * 1.2)
                 candles = await get_candles(client, symbol, timeframe, start_time=start_time, end_time=end_time, limit=required_candles)
 
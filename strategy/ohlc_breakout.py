@@ -24,6 +24,7 @@ Exit Logic:
 """
 
 import logging
+import time
 import numpy as np
 import traceback
 from typing import Dict, Any, Optional, List
@@ -287,7 +288,7 @@ class OHLCBreakoutStrategy(BaseStrategy):
 
         latest_candle = candles[-1]
         candle_time = latest_candle.get("time", 0)
-        current_time = int(datetime.utcnow().timestamp())
+        current_time = int(time.time())
 
         timeframe_seconds = TIMEFRAME_SECONDS.get(timeframe, 180)
         candle_close_time = candle_time + timeframe_seconds
@@ -1,4 +1,6 @@
+import asyncio
 import logging
+import traceback
 from typing import Dict, Any, Optional
 from datetime import datetime
 from api.delta_client import DeltaExchangeClient
@@ -14,7 +16,7 @@ from api.orders import (
     is_order_gone,
     format_orders_display       # <-- Is used in orders_callback
 )
-from api.positions import get_position_by_symbol
+from api.positions import get_position_by_symbol, get_position_snapshot
 from api.market_data import get_product_by_symbol
 from database.crud import (
     create_trade_state, update_trade_state, 
@@ -78,11 +80,11 @@ class PositionManager:
 
             # Collision guard: verify no position already exists on exchange.
             # Catches edge cases where DB is out of sync (race condition, manual entry, etc.)
-            existing_pos = await get_position_by_symbol(client, symbol, retry_count=1)
-            if existing_pos and abs(float(existing_pos.get("size", 0))) > 0:
+            _, existing_size, is_open = await get_position_snapshot(client, symbol, retry_count=1)
+            if is_open:
                 logger.warning(
                     f"⚠️ ENTRY BLOCKED: {symbol} already has an open position on exchange "
-                    f"(size={existing_pos.get('size')}). Releasing lock."
+                    f"(size={existing_size}). Releasing lock."
                 )
                 await release_position_lock(db, symbol, setup_id, api_id=api_id)
                 return False
@@ -140,7 +142,6 @@ class PositionManager:
                 
                 # ---> JOURNAL ENTRY HOOK <---
                 try:
-                    import asyncio
                     from services.journal_service import journal_service
                     trade_data["trade_id"] = trade_id
                     asyncio.create_task(journal_service.record_entry(trade_data, entry_order))
@@ -209,7 +210,6 @@ class PositionManager:
             
         except Exception as e:
             logger.error(f"❌ Exception placing breakout entry order: {e}")
-            import traceback
             logger.error(traceback.format_exc())
             return False
 
@@ -293,7 +293,6 @@ class PositionManager:
                 
                 # ---> JOURNAL ENTRY HOOK (Pending Fill) <---
                 try:
-                    import asyncio
                     from services.journal_service import journal_service
                     # Merge update_data so journal sees entry_time, entry_price, etc.
                     j_trade = dict(trade_state, **update_data)
@@ -386,7 +385,6 @@ class PositionManager:
             
         except Exception as e:
             logger.error(f"❌ Exception checking entry fill: {e}")
-            import traceback
             logger.error(traceback.format_exc())
             return False
 
@@ -454,7 +452,8 @@ class PositionManager:
 
             logger.info(f"🚪 Executing exit for {setup_name} - {current_position.upper()} position")
             
-            actual_position = await get_position_by_symbol(client, symbol)
+            # Read live: a cached list could predate an SL fill or a flip
+            actual_position = await get_position_by_symbol(client, symbol, use_cache=False)
             actual_size = actual_position.get("size", 0) if actual_position else 0
             
             # Detect direction mismatch: exchange position flipped vs what bot expects
@@ -538,7 +537,6 @@ class PositionManager:
             
             # ---> JOURNAL EXIT HOOK <---
             try:
-                import asyncio
                 from services.journal_service import journal_service
                 trade_state["trade_id"] = trade_id
                 trade_state["exit_price"] = exit_price
@@ -567,7 +565,6 @@ class PositionManager:
 
         except Exception as e:
             logger.error(f"❌ Exception executing exit: {e}")
-            import traceback
             logger.error(traceback.format_exc())
             return False, 0.0, ""
 
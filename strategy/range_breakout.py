@@ -12,6 +12,7 @@ Exit Logic:
 """
 
 import logging
+import time
 import numpy as np
 import pandas as pd
 from typing import Dict, Any, Optional, List
@@ -149,7 +150,7 @@ class RangeBreakoutStrategy(BaseStrategy):
 
         latest_candle = candles[-1]
         candle_time = latest_candle.get("time", 0)
-        current_time = int(datetime.utcnow().timestamp())
+        current_time = int(time.time())
 
         timeframe_seconds = TIMEFRAME_SECONDS.get(timeframe, 180)
         candle_close_time = candle_time + timeframe_seconds
@@ -7,6 +7,7 @@ Maps to primary/secondary keys for IndicatorCache.
 """
 
 import logging
+import time
 import traceback
 from typing import Dict, Any, Optional, List
 from datetime import datetime
@@ -102,7 +103,7 @@ class SingleSuperTrendStrategy(BaseStrategy):
 
         latest_candle = candles[-1]
         candle_time = latest_candle.get("time", 0)
-        current_time = int(datetime.utcnow().timestamp())
+        current_time = int(time.time())
 
         timeframe_seconds = TIMEFRAME_SECONDS.get(timeframe, 180)
         candle_close_time = candle_time + timeframe_seconds
@@ -141,7 +142,7 @@ class SingleSuperTrendStrategy(BaseStrategy):
     
                 candle_status = self._is_candle_closed(latest_candles, timeframe)
     
-                end_time = int(datetime.utcnow().timestamp())
+                end_time = int(time.time())
                 start_time = end_time - int(timeframe_seconds * required_candles * 1.2)
                 candles = await get_candles(client, symbol, timeframe, start_time=start_time, end_time=end_time, limit=required_candles)
 
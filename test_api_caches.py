@@ -0,0 +1,367 @@
+"""Tests for the API-layer caches and request coalescing."""
+import asyncio
+import base64
+import os
+
+# Settings are validated at import time; give the required fields dummy values
+os.environ.setdefault("TELEGRAM_BOT_TOKEN", "test")
+os.environ.setdefault("TELEGRAM_LOGGER_BOT_TOKEN", "test")
+os.environ.setdefault("TELEGRAM_LOGGER_CHAT_ID", "0")
+os.environ.setdefault("MONGODB_URI", "mongodb://localhost")
+os.environ.setdefault("WEBHOOK_URL", "http://localhost")
+os.environ.setdefault("ENCRYPTION_KEY", base64.urlsafe_b64encode(b"0" * 32).decode())
+
+import pytest
+
+from api import market_data, orders, positions
+from api.delta_client import DeltaExchangeClient
+
+
+def _client(api_key: str = "key") -> DeltaExchangeClient:
+    return DeltaExchangeClient(api_key, "secret")
+
+
+class FakeSend:
+    """Stand-in for DeltaExchangeClient._send_request that blocks until released."""
+
+    def __init__(self, *results):
+        self.results = list(results)
+        self.calls = 0
+        self.release = asyncio.Event()
+
+    async def __call__(self, method, endpoint, params=None, json_data=None, retry=0, etag=None):
+        self.calls += 1
+        result = self.results.pop(0)
+        await self.release.wait()
+        if isinstance(result, BaseException):
+            raise result
+        return result
+
+
+# --- Coalesced GETs (DeltaExchangeClient._request) ---
+
+def test_coalesced_get_sends_once_and_copies_per_waiter():
+    async def run():
+        client = _client()
+        send = client._send_request = FakeSend({"result": [{"id": 1}]})
+        first = asyncio.create_task(client.get("/v2/orders", {"state": "open"}))
+        second = asyncio.create_task(client.get("/v2/orders", {"state": "open"}))
+        await asyncio.sleep(0)
+        send.release.set()
+        a, b = await asyncio.gather(first, second)
+        assert send.calls == 1
+        assert a == b
+        a["result"][0]["bracket_label"] = "Bracket - SL"
+        assert "bracket_label" not in b["result"][0]
+
+    asyncio.run(run())
+
+
+def test_coalesced_get_error_reaches_every_waiter():
+    async def run():
+        client = _client()
+        send = client._send_request = FakeSend(RuntimeError("boom"))
+        tasks = [asyncio.create_task(client.get("/v2/orders")) for _ in range(3)]
+        await asyncio.sleep(0)
+        send.release.set()
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+        assert send.calls == 1
+        assert all(isinstance(r, RuntimeError) for r in results)
+        assert not client._inflight
+
+    asyncio.run(run())
+
+
+def test_cancelled_leader_makes_waiters_resend():
+    async def run():
+        client = _client()
+        send = client._send_request = FakeSend({"never": "sent"}, {"result": "retried"})
+        leader = asyncio.create_task(client.get("/v2/orders"))
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(client.get("/v2/orders"))
+        await asyncio.sleep(0)
+        leader.cancel()
+        await asyncio.sleep(0)
+        send.release.set()
+        assert await waiter == {"result": "retried"}
+        assert leader.cancelled()
+        assert send.calls == 2
+
+    asyncio.run(run())
+
+
+def test_cancelled_waiter_leaves_request_running():
+    async def run():
+        client = _client()
+        send = client._send_request = FakeSend({"result": "ok"})
+        leader = asyncio.create_task(client.get("/v2/orders"))
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(client.get("/v2/orders"))
+        await asyncio.sleep(0)
+        waiter.cancel()
+        send.release.set()
+        assert await leader == {"result": "ok"}
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+
+    asyncio.run(run())
+
+
+# --- Conditional GET in get_order_by_id ---
+
+class FakeOrderClient:
+    """Answers /v2/orders/{id} with a 200 carrying an ETag, then 304s for that ETag."""
+
+    api_key = "key"
+
+    def __init__(self):
+        self.etags_sent = []
+
+    async def get(self, endpoint, params=None, etag=None):
+        self.etags_sent.append(etag)
+        if etag == '"v1"':
+            return {"success": True, "not_modified": True, "etag": etag}
+        return {"success": True, "result": {"id": 7, "state": "open"}, "etag": '"v1"'}
+
+
+def test_get_order_by_id_serves_304_from_a_private_copy():
+    async def run():
+        orders._order_etags.clear()
+        client = FakeOrderClient()
+        first = await orders.get_order_by_id(client, 7)
+        first["state"] = "edited by caller"
+        second = await orders.get_order_by_id(client, 7)
+        assert client.etags_sent == ["", '"v1"']
+        assert second == {"id": 7, "state": "open"}
+        second["state"] = "edited again"
+        assert (await orders.get_order_by_id(client, 7))["state"] == "open"
+
+    asyncio.run(run())
+
+
+# --- Live candle cache (get_candles) ---
+
+class FakeCandleClient:
+    """Returns two 1m candles (newest first, like the API) and counts requests."""
+
+    base_url = "https://test"
+
+    def __init__(self):
+        self.calls = 0
+
+    async def get(self, endpoint, params=None, etag=None):
+        self.calls += 1
+        return {"success": True, "result": [
+            {"time": 120, "open": "2", "high": "3", "low": "1", "close": "2.5", "volume": "10"},
+            {"time": 60, "open": "1", "high": "2", "low": "1", "close": "2", "volume": None},
+        ]}
+
+
+def test_candle_cache_copies_rows_and_expires_with_its_bucket(monkeypatch):
+    now = [1_000_000.0]
+    monkeypatch.setattr(market_data.time, "time", lambda: now[0])
+    market_data._candles_cache.clear()
+
+    async def run():
+        client = FakeCandleClient()
+        first = await market_data.get_candles(client, "BTCUSD", "1m", limit=2)
+        assert [c["time"] for c in first] == [60, 120]
+        first[-1]["close"] = 0.0
+        second = await market_data.get_candles(client, "BTCUSD", "1m", limit=2)
+        assert client.calls == 1
+        assert second[-1]["close"] == 2.5
+        second[-1]["close"] = 0.0
+
+        now[0] += market_data._candles_cache_max_seconds
+        third = await market_data.get_candles(client, "BTCUSD", "1m", limit=2)
+        assert client.calls == 2
+        assert third[-1]["close"] == 2.5
+
+    asyncio.run(run())
+
+
+# --- Tickers snapshot (get_tickers_snapshot / get_ticker) ---
+
+class FakeTickerClient:
+    """Serves /v2/tickers and /v2/tickers/{symbol} with a per-exchange mark price."""
+
+    def __init__(self, base_url, mark_price):
+        self.base_url = base_url
+        self.mark_price = mark_price
+        self.endpoints = []
+
+    async def get(self, endpoint, params=None, etag=None):
+        self.endpoints.append(endpoint)
+        ticker = {"symbol": "BTCUSD", "mark_price": self.mark_price}
+        if endpoint == "/v2/tickers":
+            return {"success": True, "result": [ticker]}
+        return {"success": True, "result": ticker}
+
+
+def test_tickers_snapshot_is_kept_per_base_url():
+    market_data._tickers_snapshots.clear()
+
+    async def run():
+        india = FakeTickerClient("https://india", "100")
+        testnet = FakeTickerClient("https://testnet", "200")
+        assert (await market_data.get_ticker(india, "BTCUSD"))["mark_price"] == "100"
+        assert (await market_data.get_ticker(testnet, "BTCUSD"))["mark_price"] == "200"
+        assert (await market_data.get_ticker(india, "BTCUSD"))["mark_price"] == "100"
+        assert india.endpoints == ["/v2/tickers"]
+        assert testnet.endpoints == ["/v2/tickers"]
+
+    asyncio.run(run())
+
+
+def test_get_ticker_without_cache_fetches_the_symbol():
+    market_data._tickers_snapshots.clear()
+
+    async def run():
+        client = FakeTickerClient("https://india", "100")
+        await market_data.get_ticker(client, "BTCUSD")
+        client.mark_price = "101"
+        assert (await market_data.get_ticker(client, "BTCUSD"))["mark_price"] == "100"
+        assert (await market_data.get_ticker(client, "BTCUSD", use_cache=False))["mark_price"] == "101"
+        assert client.endpoints == ["/v2/tickers", "/v2/tickers/BTCUSD"]
+
+    asyncio.run(run())
+
+
+# --- Order placement error logging ---
+
+class FailingPostClient:
+    api_key = "key"
+
+    async def post(self, endpoint, json_data):
+        raise RuntimeError("connection reset")
+
+
+@pytest.mark.parametrize("place", [
+    lambda c: orders.place_order(c, 1, 1, "buy"),
+    lambda c: orders.place_market_order(c, 1, 1, "buy"),
+    lambda c: orders.place_stop_loss_order(c, 1, 1, "sell", 100.0),
+])
+def test_failed_order_is_logged_once(place, caplog):
+    with caplog.at_level("ERROR", logger="api.orders"):
+        assert asyncio.run(place(FailingPostClient())) is None
+    assert len(caplog.records) == 1
+    assert "connection reset" in caplog.records[0].getMessage()
+
+
+# --- cancel_all_orders result ---
+
+class FakeCancelClient:
+    api_key = "key"
+
+    def __init__(self, bulk_response):
+        self.bulk_response = bulk_response
+        self.gets = 0
+
+    async def delete(self, endpoint, params=None, json_data=None):
+        return self.bulk_response
+
+    async def get(self, endpoint, params=None, etag=None):
+        self.gets += 1
+        return {"success": True, "result": []}
+
+
+@pytest.mark.parametrize("bulk_response, expected, individual", [
+    ({"success": True, "result": [{"id": 1}, {"id": 2}]}, 2, False),
+    ({"success": True}, None, False),
+    ({"success": False}, 0, True),
+])
+def test_cancel_all_orders_reports_count_or_none(bulk_response, expected, individual):
+    orders._orders_cache.clear()
+    client = FakeCancelClient(bulk_response)
+    assert asyncio.run(orders.cancel_all_orders(client)) == expected
+    assert (client.gets > 0) is individual
+
+
+# --- Open-orders and positions caches: TTL and invalidation ---
+
+def _age(cache, seconds):
+    """Make every entry of a (time.monotonic(), ...) cache look `seconds` older."""
+    for key, entry in cache.items():
+        cache[key] = (entry[0] - seconds, *entry[1:])
+
+
+class FakeAccountClient:
+    """One account with BTCUSD open: serves orders and positions, accepts orders and cancels."""
+
+    api_key = "key"
+
+    def __init__(self):
+        self.position_size = 5
+        self.order_fetches = 0
+        self.position_fetches = 0
+
+    async def get(self, endpoint, params=None, etag=None):
+        if endpoint == "/v2/orders":
+            self.order_fetches += 1
+            return {"success": True, "result": [{"id": 10, "product_id": 1}]}
+        self.position_fetches += 1
+        return {"success": True, "result": [{"product_symbol": "BTCUSD", "size": self.position_size}]}
+
+    async def post(self, endpoint, json_data):
+        return {"success": True, "result": {"id": 11}}
+
+    async def delete(self, endpoint, params=None, json_data=None):
+        return {"success": True}
+
+
+@pytest.fixture
+def account():
+    orders._orders_cache.clear()
+    orders._recently_cancelled.clear()
+    positions.invalidate_positions_cache()
+    return FakeAccountClient()
+
+
+def test_open_orders_cache_expires_and_is_invalidated(account):
+    async def run():
+        await orders.get_open_orders(account, 1)
+        await orders.get_open_orders(account, 1)
+        assert account.order_fetches == 2  # open + untriggered, once
+
+        _age(orders._orders_cache, orders.ORDERS_CACHE_TTL)
+        await orders.get_open_orders(account, 1)
+        assert account.order_fetches == 4
+
+        await orders.place_market_order(account, 1, 1, "buy")
+        await orders.get_open_orders(account, 1)
+        assert account.order_fetches == 6
+
+        assert await orders.cancel_order(account, 1, 10)
+        await orders.get_open_orders(account, 1)
+        assert account.order_fetches == 8
+
+    asyncio.run(run())
+
+
+def test_positions_cache_expires_and_is_invalidated_by_orders(account):
+    async def run():
+        assert (await positions.get_position_by_symbol(account, "BTCUSD"))["size"] == 5
+        await positions.get_position_by_symbol(account, "BTCUSD")
+        assert account.position_fetches == 1
+
+        _age(positions._positions_cache, positions.POSITIONS_CACHE_TTL)
+        await positions.get_position_by_symbol(account, "BTCUSD")
+        assert account.position_fetches == 2
+
+        await orders.place_market_order(account, 1, 1, "sell")
+        await positions.get_position_by_symbol(account, "BTCUSD")
+        assert account.position_fetches == 3
+
+    asyncio.run(run())
+
+
+def test_position_lookup_without_cache_sees_a_closed_position(account):
+    async def run():
+        assert await positions.get_position_by_symbol(account, "BTCUSD") is not None
+        account.position_size = 0  # e.g. the stop-loss filled
+        assert await positions.get_position_by_symbol(account, "BTCUSD", retry_count=1) is not None
+        assert await positions.get_position_by_symbol(account, "BTCUSD", retry_count=1, use_cache=False) is None
+        _, size, is_open = await positions.get_position_snapshot(account, "BTCUSD", retry_count=1, use_cache=False)
+        assert (size, is_open) == (0.0, False)
+
+    asyncio.run(run())
@@ -1,6 +1,10 @@
 """Helper utility functions."""
+import copy
+import functools
 import logging
-from typing import Any, Dict
+from typing import Any, Awaitable, Callable, Dict, TypeVar
+
+T = TypeVar("T")
 
 logger = logging.getLogger(__name__)
 
@@ -82,3 +86,32 @@ def safe_int(value: Any, default: int = 0) -> int:
     except (ValueError, TypeError):
         return default
       
+
+
+def safe_async(default: Any = None) -> Callable[[Callable[..., Awaitable[T]]], Callable[..., Awaitable[T]]]:
+    """
+    Decorate an async function so any exception is logged and `default` returned.
+    
+    The traceback is logged with logger.exception on the decorated
+    function's module logger, so records keep their usual logger name.
+    Cancellation is not swallowed.
+    
+    Args:
+        default: Value returned when the wrapped coroutine raises (a
+            shallow copy, so a mutable default like [] is never shared)
+    
+    Returns:
+        Decorator
+    """
+    def decorator(fn: Callable[..., Awaitable[T]]) -> Callable[..., Awaitable[T]]:
+        fn_logger = logging.getLogger(fn.__module__)
+        
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            try:
+                return await fn(*args, **kwargs)
+            except Exception as e:
+                fn_logger.exception("❌ %s failed: %s", fn.__name__, e)
+                return copy.copy(default)
+        return wrapper
+    return decorator
@@ -1,6 +1,6 @@
 """Market utility functions for fetching asset data."""
 import logging
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 import aiohttp
 from api.delta_client import DeltaExchangeClient
 
@@ -90,6 +90,8 @@ async def get_top_gainers(client: DeltaExchangeClient, limit: int = 10) -> List[
 _contract_multipliers_cache: Dict[str, float] = {}
 _max_leverage_cache: Dict[str, float] = {}
 _tick_size_cache: Dict[str, float] = {}
+# product_id -> tick size exactly as Delta sends it (e.g. "0.5"), for price formatting
+_tick_size_str_by_product: Dict[int, str] = {}
 
 async def refresh_contract_multipliers() -> None:
     """Fetch and cache contract values, tick sizes, and max leverage for all products from Delta Exchange."""
@@ -112,6 +114,8 @@ async def refresh_contract_multipliers() -> None:
                         _tick_size_cache[sym] = float(tick_size)
                     except ValueError:
                         pass
+                if p.get("id") is not None and tick_size is not None:
+                    _tick_size_str_by_product[int(p["id"])] = str(tick_size)
                         
                 # Cache max leverage from initial_margin
                 # initial_margin is a percentage string, e.g. "0.5" means 0.5% → max leverage = 100/0.5 = 200x
@@ -162,6 +166,13 @@ def get_tick_size(symbol: str) -> float:
         return 0.5
     return 0.0001
 
+def get_tick_size_str(product_id: int) -> Optional[str]:
+    """
+    Get a product's tick size as the exact decimal string Delta reports.
+    Returns None if the product is not in the cache.
+    """
+    return _tick_size_str_by_product.get(product_id)
+
 def get_max_leverage(symbol: str) -> float:
     """
     Get the max allowed leverage for a symbol from cache.
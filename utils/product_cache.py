@@ -0,0 +1,63 @@
+"""On-disk cache for the Delta Exchange product list."""
+import logging
+import os
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import orjson
+
+logger = logging.getLogger(__name__)
+
+CACHE_PATH = Path(os.path.expanduser("~/.cache/delta-futures/products.json"))
+
+
+def load(source: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """
+    Load the cached product list from disk.
+    
+    Args:
+        source: API base URL the list must have been fetched from; a file
+            saved for a different exchange is ignored
+    
+    Returns:
+        Dict with "products", "etag" and "saved_at" (Unix seconds), or None
+        if there is no usable cache file
+    """
+    try:
+        data = orjson.loads(CACHE_PATH.read_bytes())
+        if (isinstance(data, dict) and isinstance(data.get("products"), list)
+                and (source is None or data.get("source") in (None, source))):
+            return data
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        logger.warning(f"⚠️ Ignoring unreadable product cache: {e}")
+    return None
+
+
+def save(products: List[Dict[str, Any]], etag: Optional[str] = None,
+         source: Optional[str] = None) -> None:
+    """
+    Persist the product list (and its ETag) to disk.
+    
+    Writes to a temp file and renames it so readers never see a partial file.
+    
+    Args:
+        products: Product list from /v2/products
+        etag: ETag returned with the list, if any
+        source: API base URL the list was fetched from
+    """
+    try:
+        CACHE_PATH.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = CACHE_PATH.with_suffix(".tmp")
+        tmp_path.write_bytes(orjson.dumps({
+            "products": products,
+            "etag": etag,
+            "source": source,
+            "saved_at": time.time()
+        }))
+        os.replace(tmp_path, CACHE_PATH)
+    except Exception as e:
+        logger.warning(f"⚠️ Failed to write product cache: {e}")
+